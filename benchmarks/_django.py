@@ -0,0 +1,54 @@
+"""
+Общая обвязка для бенчмарков.
+
+Бенчмарки запускаются как отдельные скрипты из корня репозитория
+(`python benchmarks/bench_*.py`) и работают с временной базой SQLite,
+чтобы не трогать рабочие данные.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(ROOT_DIR, "yatube")
+
+
+def setup(**overrides):
+    """Настраивает Django на временную базу и применяет миграции."""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+
+    import django
+    from django.conf import settings
+
+    workdir = tempfile.mkdtemp(prefix="yatube-bench-")
+    settings.DATABASES["default"]["NAME"] = os.path.join(
+        workdir, "bench.sqlite3"
+    )
+    settings.MEDIA_ROOT = os.path.join(workdir, "media")
+    settings.DEBUG = False
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+    return workdir
+
+
+def measure(func, repeat=20):
+    """Возвращает медиану времени вызова func в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def report(rows):
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"{name:<{width}}  {value:10.2f} ms")
@@ -0,0 +1,113 @@
+"""
+Скорость операций кэша: LocMemCache, FileBasedCache и SQLiteCache.
+Время указано на OPS операций; для «4 процесса» — время, за которое
+четыре процесса параллельно выполняют по OPS чтений из общего кэша
+(у LocMemCache у каждого процесса свой кэш, и он в сравнении не
+участвует).
+
+    python benchmarks/bench_cache_backends.py --ops 1000
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import _django
+
+VALUE = {"page": list(range(100)), "title": "Заголовок" * 10}
+
+
+def backends(workdir):
+    return {
+        "locmem": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "bench",
+            "OPTIONS": {"MAX_ENTRIES": 100_000},
+        },
+        "filebased": {
+            "BACKEND":
+                "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(workdir, "filebased"),
+            "OPTIONS": {"MAX_ENTRIES": 100_000},
+        },
+        "sqlite": {
+            "BACKEND": "yatube.cache.SQLiteCache",
+            "LOCATION": os.path.join(workdir, "cache.sqlite3"),
+            "OPTIONS": {"MAX_ENTRIES": 100_000},
+        },
+    }
+
+
+def read_all(config, ops, start):
+    from yatube.cache.base import create_cache
+
+    cache = create_cache(config)
+    start.wait()
+    for num in range(ops):
+        cache.get(f"key:{num % 100}")
+
+
+def parallel_reads(config, ops, processes=4):
+    context = multiprocessing.get_context("fork")
+    start = context.Barrier(processes + 1)
+    workers = [
+        context.Process(target=read_all, args=(config, ops, start))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _django.setup()
+    workdir = tempfile.mkdtemp(prefix="yatube-bench-cache-")
+
+    from yatube.cache.base import create_cache
+
+    batches = [
+        [f"key:{num % 100}" for num in range(start, start + 10)]
+        for start in range(0, args.ops, 10)
+    ]
+    rows = []
+    for name, config in backends(workdir).items():
+        cache = create_cache(config)
+        cache.set("counter", 0)
+        operations = {
+            "set": lambda: [
+                cache.set(f"key:{num % 100}", VALUE)
+                for num in range(args.ops)
+            ],
+            "get": lambda: [
+                cache.get(f"key:{num % 100}") for num in range(args.ops)
+            ],
+            "get_many(10)": lambda: [
+                cache.get_many(batch) for batch in batches
+            ],
+            "incr": lambda: [cache.incr("counter") for _ in range(args.ops)],
+        }
+        for operation, func in operations.items():
+            rows.append((
+                f"{name}, {operation}",
+                _django.measure(func, args.repeat),
+            ))
+        if name != "locmem":
+            rows.append((
+                f"{name}, get x 4 процесса",
+                parallel_reads(config, args.ops),
+            ))
+    _django.report(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Сравнение движков ленты подписок на пользователе, подписанном
+на тысячи авторов с небольшим числом постов.
+
+    python benchmarks/bench_follow_feed.py --authors 5000 --posts 3
+"""
+import argparse
+from datetime import timedelta
+
+import _django
+
+
+def populate(authors, posts_per_author):
+    from django.utils import timezone
+
+    from posts.models import Follow, Post, User
+
+    reader = User.objects.create_user(username="reader")
+    User.objects.bulk_create(
+        User(username=f"author_{num}") for num in range(authors)
+    )
+    author_ids = list(
+        User.objects.exclude(pk=reader.pk).values_list("pk", flat=True)
+    )
+    Follow.objects.bulk_create(
+        Follow(user=reader, author_id=author_id) for author_id in author_ids
+    )
+    now = timezone.now()
+    Post.objects.bulk_create(
+        (
+            Post(text=f"Пост {num}", author_id=author_id)
+            for num, author_id in enumerate(
+                author_ids * posts_per_author
+            )
+        ),
+        batch_size=1000,
+    )
+    # bulk_create ignores auto_now_add overrides, spread dates afterwards.
+    for num, pk in enumerate(Post.objects.values_list("pk", flat=True)):
+        if num % 97 == 0:
+            Post.objects.filter(pk=pk).update(
+                pub_date=now - timedelta(minutes=num)
+            )
+    return reader
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--authors", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Per-author lists must fit into the cache, otherwise LocMemCache
+    # culls them and every request goes back to the database.
+    _django.setup(CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": args.authors * 2},
+        },
+    })
+
+    from django.core.cache import cache
+    from django.core.paginator import Paginator
+    from django.test import override_settings
+
+    from posts import feeds, timeline
+
+    reader = populate(args.authors, args.posts)
+    timeline.rebuild([reader.pk])
+
+    def page(engine, number):
+        with override_settings(POSTS_FEED_ENGINE=engine):
+            paginator = Paginator(feeds.follow_feed(reader), 10)
+            return list(paginator.get_page(number).object_list)
+
+    rows = []
+    for engine in feeds.ENGINES:
+        cache.clear()
+        page(engine, 1)
+        for number in (1, 50):
+            rows.append((
+                f"{engine}, page {number}",
+                _django.measure(
+                    lambda: page(engine, number), args.repeat
+                ),
+            ))
+    _django.report(rows)
+
+
+if __name__ == "__main__":
+    main()
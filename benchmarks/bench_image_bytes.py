@@ -0,0 +1,117 @@
+"""
+Байты картинок на страницу ленты: одна JPEG-миниатюра 960x339 на всех
+устройствах против вариантов из srcset, которые выбрал бы браузер при
+разной ширине экрана и плотности пикселей.
+
+    python benchmarks/bench_image_bytes.py --posts 10
+"""
+import argparse
+import io
+import random
+
+import _django
+
+# (CSS width of the viewport, device pixel ratio)
+DEVICES = (
+    (360, 2),
+    (414, 3),
+    (768, 2),
+    (1280, 1),
+    (1920, 2),
+)
+CARD_WIDTH = 960
+
+
+def make_photo(seed, size=(1600, 1000)):
+    """Картинка, похожая на фотографию: градиент с шумом и фигурами."""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rnd = random.Random(seed)
+    image = Image.effect_noise(size, 40).convert("RGB")
+    overlay = Image.linear_gradient("L").resize(size).convert("RGB")
+    image = Image.blend(image, overlay, 0.6)
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        radius = rnd.randrange(20, 200)
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + radius, y + radius), fill=color)
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def pick(candidates, slot_width):
+    """Вариант, который браузер выберет из srcset для слота такой ширины."""
+    candidates = sorted(candidates, key=lambda item: item[0])
+    for width, size in candidates:
+        if width >= slot_width:
+            return size
+    return candidates[-1][1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=10)
+    args = parser.parse_args()
+
+    _django.setup(POSTS_THUMBNAIL_WORKERS=0)
+
+    from django.contrib.auth import get_user_model
+    from django.core.files.base import ContentFile
+    from sorl.thumbnail import default
+
+    from posts import thumbnails
+    from posts.models import Post
+
+    author = get_user_model().objects.create_user(username="bench")
+    posts = []
+    for num in range(args.posts):
+        post = Post.objects.create(
+            text=f"Пост {num}",
+            author=author,
+            image=ContentFile(make_photo(num), name=f"photo_{num}.jpg"),
+        )
+        thumbnails.generate(post.image.name)
+        posts.append(post)
+
+    variants = thumbnails.get_variants("card")
+    found = thumbnails._find(
+        (post.image for post in posts),
+        {"card": thumbnails.get_sizes()["card"], **variants},
+    )
+
+    def size_of(file_):
+        return default.storage.size(file_.name)
+
+    jpeg = sum(size_of(found[post.image.name, "card"]) for post in posts)
+    print(f"formats: {', '.join(thumbnails.get_formats()) or 'none'}")
+    print(f"{'device':<12} {'jpeg 960w':>12} {'srcset':>12} {'saved':>7}")
+    for viewport, ratio in DEVICES:
+        slot = min(viewport, CARD_WIDTH) * ratio
+        total = 0
+        for post in posts:
+            # The first format in the list the browser supports wins.
+            for format_ in thumbnails.get_formats():
+                candidates = [
+                    (found[key].width, size_of(found[key]))
+                    for key in (
+                        (post.image.name, label) for label in variants
+                        if label[0] == format_
+                    )
+                    if key in found
+                ]
+                if candidates:
+                    total += pick(candidates, slot)
+                    break
+            else:
+                total += size_of(found[post.image.name, "card"])
+        print(
+            f"{viewport}px@{ratio}x".ljust(12)
+            + f" {jpeg:>12} {total:>12} {1 - total / jpeg:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
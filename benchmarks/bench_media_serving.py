@@ -0,0 +1,102 @@
+"""
+Пропускная способность раздачи медиафайлов: django.views.static.serve
+(прежняя раздача в DEBUG) против yatube.serving.media.
+
+Ответ «отправляется» так, как это делает WSGI-сервер с
+wsgi.file_wrapper: файл с fileno() уходит через os.sendfile() с
+текущей позиции на Content-Length байт, остальное читается по кускам.
+Запросы: весь файл, перепроверка кэша (If-None-Match/If-Modified-Since)
+и диапазон 64 КиБ из середины, как при перемотке видео или докачке.
+
+    python benchmarks/bench_media_serving.py --size-mb 10
+"""
+import argparse
+import os
+
+import _django
+
+
+def send(response):
+    """Отправляет тело ответа в /dev/null; возвращает число байт."""
+    filelike = getattr(response, "file_to_stream", None)
+    if filelike is None or not hasattr(filelike, "fileno"):
+        content = b"".join(response) if response.streaming else (
+            response.content
+        )
+        return len(content)
+    length = int(response["Content-Length"])
+    source = filelike.fileno()
+    offset = os.lseek(source, 0, os.SEEK_CUR)
+    sent = 0
+    with open(os.devnull, "wb") as sink:
+        while sent < length:
+            done = os.sendfile(
+                sink.fileno(), source, offset + sent, length - sent
+            )
+            if not done:
+                break
+            sent += done
+    response.close()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    _django.setup()
+
+    from django.conf import settings
+    from django.test import RequestFactory
+    from django.views.static import serve
+
+    from yatube import serving
+
+    name = "posts/ab/cd/" + "ab" * 32 + ".mp4"
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file_:
+        file_.write(os.urandom(args.size_mb * 1024 * 1024))
+    middle = args.size_mb * 1024 * 1024 // 2
+    factory = RequestFactory()
+
+    def static_serve(**headers):
+        return serve(
+            factory.get("/", **headers), name,
+            document_root=settings.MEDIA_ROOT,
+        )
+
+    def media(**headers):
+        return serving.media(factory.get("/", **headers), name)
+
+    validators = media()
+    cases = {
+        "whole file": {},
+        "revalidation": {
+            "HTTP_IF_NONE_MATCH": validators["ETag"],
+            "HTTP_IF_MODIFIED_SINCE": validators["Last-Modified"],
+        },
+        "64 KiB range": {
+            "HTTP_RANGE": f"bytes={middle}-{middle + 64 * 1024 - 1}",
+        },
+    }
+    rows = []
+    sent = []
+    for case, headers in cases.items():
+        for title, view in (("static.serve", static_serve),
+                            ("serving.media", media)):
+            sent.append((f"{case}, {title}", send(view(**headers))))
+            rows.append((
+                f"{case}, {title}",
+                _django.measure(lambda: send(view(**headers)), args.repeat),
+            ))
+    _django.report(rows)
+    width = max(len(title) for title, _ in sent)
+    for title, count in sent:
+        print(f"{title:<{width}}  {count:>10} bytes sent")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Время отрисовки paginator.html и размер HTML при 1M постов: прежний
+цикл по page_range против окна ссылок CursorPaginator.page_links.
+
+    python benchmarks/bench_paginator_render.py --posts 1000000
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import _django
+
+# The loop paginator.html used before the windowed widget.
+FULL_RANGE_TEMPLATE = """
+{% for i in page.paginator.page_range %}
+    {% if page.number == i %}
+        <li class="page-item active">
+            <span class="page-link">{{ i }}</span>
+        </li>
+    {% else %}
+        <li class="page-item">
+            <a class="page-link" href="?page={{ i }}">{{ i }}</a>
+        </li>
+    {% endif %}
+{% endfor %}
+"""
+
+
+class FakePosts:
+    """Последовательность из n «постов» без базы данных."""
+
+    started = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return [
+            SimpleNamespace(
+                pk=self.size - num,
+                pub_date=self.started + timedelta(minutes=self.size - num),
+            )
+            for num in range(*index.indices(self.size))
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _django.setup()
+
+    from django.core.paginator import Paginator
+    from django.template import Context, Template
+    from django.template.loader import get_template
+
+    from posts.paginator import CursorPaginator
+
+    posts = FakePosts(args.posts)
+    full_range = Template(FULL_RANGE_TEMPLATE)
+    windowed = get_template("paginator.html")
+
+    def render_full_range():
+        page = Paginator(posts, 10).get_page(args.page)
+        return full_range.render(Context({"page": page}))
+
+    def render_windowed():
+        page = CursorPaginator(posts, 10).get_page(args.page)
+        return windowed.render({"page": page})
+
+    _django.report([
+        ("page_range loop", _django.measure(render_full_range, args.repeat)),
+        ("page_links window", _django.measure(render_windowed, args.repeat)),
+    ])
+    print(f"page_range loop HTML:   {len(render_full_range()):>10} bytes")
+    print(f"page_links window HTML: {len(render_windowed()):>10} bytes")
+
+
+if __name__ == "__main__":
+    main()
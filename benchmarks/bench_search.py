@@ -0,0 +1,112 @@
+"""
+Поиск по текстам постов: LIKE '%слово%' (прежний поиск в админке)
+против индекса FTS5 из posts.search.
+
+Тексты — по 20 слов из словаря с распределением Ципфа, так что есть и
+частые слова (в нескольких процентах постов), и редкие (в сотых долях
+процента). Для каждого слова измеряются подсчёт результатов (его
+делают и CursorPaginator, и список постов в админке), первая страница
+и страница по курсору.
+
+    python benchmarks/bench_search.py --posts 1000000
+"""
+import argparse
+import random
+import time
+
+import _django
+
+WORDS_PER_POST = 20
+
+
+def populate(posts, vocabulary):
+    from posts.models import Post, User
+
+    author = User.objects.create_user(username="author")
+    words = [f"слово{num}" for num in range(vocabulary)]
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    rng = random.Random(0)
+    Post.objects.bulk_create(
+        (
+            Post(
+                text=" ".join(
+                    rng.choices(words, weights, k=WORDS_PER_POST)
+                ),
+                author=author,
+            )
+            for _ in range(posts)
+        ),
+        batch_size=5000,
+    )
+    return words
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    _django.setup()
+
+    from posts import search
+    from posts.models import Post
+    from posts.paginator import CursorPaginator
+
+    words = populate(args.posts, args.vocabulary)
+    # bulk_create sends no signals, so the index is built in one go.
+    started = time.perf_counter()
+    search.rebuild()
+    print(f"index rebuild: {time.perf_counter() - started:.1f} s")
+
+    def count(object_list):
+        # CursorPaginator would share the count between requests.
+        if hasattr(object_list, "query"):
+            return object_list.count()
+        return len(object_list)
+
+    def first_page(object_list, keys):
+        return CursorPaginator(object_list, keys=keys).get_page(1)
+
+    def like(word):
+        return Post.objects.filter(text__icontains=word).select_related(
+            "author", "group"
+        )
+
+    def fts(word):
+        return search.search(word)
+
+    rows = []
+    for title, word in (("frequent", words[50]), ("rare", words[-1000])):
+        for engine, make, keys in (
+            ("LIKE", like, ("pub_date", "pk")),
+            ("FTS5", fts, search.SEARCH_KEYS),
+        ):
+            cursor = first_page(make(word), keys).next_cursor
+            name = f"{title} ({count(make(word))} posts), {engine}"
+            rows.append((
+                f"{name}, count",
+                _django.measure(lambda: count(make(word)), args.repeat),
+            ))
+            rows.append((
+                f"{name}, page 1",
+                _django.measure(
+                    lambda: list(first_page(make(word), keys)), args.repeat
+                ),
+            ))
+            if cursor:
+                rows.append((
+                    f"{name}, cursor page",
+                    _django.measure(
+                        lambda: list(CursorPaginator(
+                            make(word), keys=keys
+                        ).get_page(cursor=cursor)),
+                        args.repeat,
+                    ),
+                ))
+    _django.report(rows)
+
+
+if __name__ == "__main__":
+    main()
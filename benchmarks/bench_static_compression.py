@@ -0,0 +1,104 @@
+"""
+Раздача статики: сжатие на лету (GZipMiddleware поверх
+django.views.static.serve) против заранее сжатых копий
+(yatube.staticfiles + yatube.serving.static).
+
+Для самых крупных файлов, которые собрал бы collectstatic (в основном
+статика админки), печатается время ответа и число байт, которые уйдут
+клиенту с Accept-Encoding: gzip, br.
+
+    python benchmarks/bench_static_compression.py
+"""
+import argparse
+import os
+
+import _django
+
+
+def collect(storage, files):
+    """Собирает files самых крупных картинок статики в storage."""
+    from django.contrib.staticfiles import finders
+
+    found = []
+    for finder in finders.get_finders():
+        for name, source in finder.list(["*.png", "*.gif", "*.jpg"]):
+            found.append((source.size(name), name, source))
+    found.sort(key=lambda item: item[0], reverse=True)
+    names = []
+    for _, name, source in found[:files]:
+        with source.open(name) as file_:
+            storage.save(name, file_)
+        storage.compress(name)
+        names.append(name)
+    return sorted(names)
+
+
+def body(response):
+    if response.streaming:
+        content = b"".join(response.streaming_content)
+    else:
+        content = response.content
+    response.close()
+    return content
+
+
+def views(static_root):
+    """Способы отдать файл: (название, функция от имени файла)."""
+    from django.middleware.gzip import GZipMiddleware
+    from django.test import RequestFactory
+    from django.views.static import serve
+
+    from yatube import serving
+
+    factory = RequestFactory()
+    headers = {"HTTP_ACCEPT_ENCODING": "gzip, br"}
+
+    def on_the_fly(name):
+        request = factory.get("/", **headers)
+        middleware = GZipMiddleware(
+            lambda request: serve(request, name, document_root=static_root)
+        )
+        return middleware(request)
+
+    def precompressed(name):
+        return serving.static(factory.get("/", **headers), name)
+
+    return (("gzip on the fly", on_the_fly), ("precompressed", precompressed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--files", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = _django.setup()
+
+    from django.conf import settings
+
+    from yatube.staticfiles import CompressedManifestStaticFilesStorage
+
+    settings.STATIC_ROOT = os.path.join(workdir, "static")
+    storage = CompressedManifestStaticFilesStorage(
+        location=settings.STATIC_ROOT
+    )
+    names = collect(storage, args.files)
+    handlers = views(settings.STATIC_ROOT)
+
+    rows = []
+    sizes = []
+    for name in names:
+        for title, view in handlers:
+            sizes.append((f"{name}, {title}", len(body(view(name)))))
+            rows.append((
+                f"{name}, {title}",
+                _django.measure(lambda: body(view(name)), args.repeat),
+            ))
+    _django.report(rows)
+    width = max(len(title) for title, _ in sizes)
+    for title, count in sizes:
+        print(f"{title:<{width}}  {count:>10} bytes")
+
+
+if __name__ == "__main__":
+    main()
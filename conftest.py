@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def run_image_jobs_inline(settings):
+    # Worker threads would write to the test database while transactional
+    # tests flush it.
+    settings.POSTS_THUMBNAIL_WORKERS = 0
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Group, Post
 
 
@@ -9,6 +10,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index instead of LIKE '%...%' over every post.
+        pks = search.matching_pks(search_term)
+        if pks is None:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=pks), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("pk", "title", "slug", "description")
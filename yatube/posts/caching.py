@@ -0,0 +1,236 @@
+"""
+Кэш страниц и списков постов с инвалидацией по тегам.
+
+Тег — имя того, от чего зависит закэшированное: "index" (состав
+главной страницы), group:<slug>, author:<id>, user:<id> (данные
+профиля), post:<id>. У каждого тега есть версия — метка времени его
+последнего изменения. Закэшированное значение запоминает версии своих
+тегов и считается устаревшим, как только одна из них сдвинулась;
+invalidate_tags() сдвигает версии, и сигналы вызывают её при изменении
+моделей. Поэтому время жизни кэша может быть большим.
+
+Список постов помечается тегом своего состава и тегами показанных
+постов, так что правка поста сбрасывает только страницы, где он есть.
+
+Для анонимных читателей страницы кэшируются целиком (см.
+cache_anonymous_page): версии тегов служат валидаторами ETag и
+Last-Modified, а тела хранятся сжатыми gzip.
+"""
+import gzip
+import hashlib
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date
+from django.utils.text import compress_string
+
+from . import holes
+
+VERSION_KEY = "posts:version:{}"
+PAGE_KEY = "posts:page:{}"
+LISTING_TIMEOUT = 60 * 60 * 6
+
+INDEX = "index"
+
+_render_started = ContextVar("render_started", default=None)
+
+
+def group_tag(slug):
+    return f"group:{slug}"
+
+
+def author_tag(author_id):
+    """Состав постов автора."""
+    return f"author:{author_id}"
+
+
+def user_tag(user_id):
+    """Данные профиля пользователя: имя, счётчики подписок."""
+    return f"user:{user_id}"
+
+
+def post_tag(post_id):
+    return f"post:{post_id}"
+
+
+def listing_tags(page, *tags):
+    """Теги страницы списка: теги его состава и показанных постов."""
+    return [*tags, *(post_tag(post.pk) for post in page)]
+
+
+def get_versions(*tags):
+    """Метки времени последнего изменения тегов, в порядке tags."""
+    keys = [VERSION_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    # Inside cache_anonymous_page a new version must not look like an
+    # invalidation that happened while the page was rendered.
+    initial = _render_started.get() or time.time()
+    missing = {key: initial for key in keys if key not in versions}
+    if missing:
+        # A lost version just means a cold cache for that tag.
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def get_version(*tags):
+    return "-".join(repr(version) for version in get_versions(*tags))
+
+
+def invalidate_tags(*tags):
+    """Сбрасывает всё, что закэшировано с любым из тегов."""
+    if not tags:
+        return
+    now = time.time()
+    cache.set_many({VERSION_KEY.format(tag): now for tag in tags}, None)
+
+
+def set_tagged(key, value, tags, timeout=None, versions=None):
+    """Кладёт value в кэш вместе с версиями тегов (по умолчанию
+    текущими) и возвращает эти версии."""
+    tags = list(tags)
+    if versions is None:
+        versions = get_versions(*tags)
+    cache.set(key, (value, tags, versions), timeout)
+    return versions
+
+
+def get_tagged(key):
+    """
+    Возвращает (value, versions) для ключа, записанного set_tagged, или
+    None, если записи нет или какой-то из её тегов сброшен.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    value, tags, versions = entry
+    if get_versions(*tags) != versions:
+        return None
+    return value, versions
+
+
+def listing_context(tags):
+    """Контекст для {% cache %} списка постов с тегами tags."""
+    return {
+        "cache_version": get_version(*tags),
+        "cache_timeout": get_timeout(),
+    }
+
+
+def tag_response(response, tags):
+    """Отмечает, от каких тегов зависит ответ (см. cache_anonymous_page)."""
+    response.cache_tags = list(tags)
+    return response
+
+
+def get_timeout():
+    return getattr(settings, "POSTS_LISTING_CACHE_TIMEOUT", LISTING_TIMEOUT)
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Browsers must revalidate, which is cheap thanks to the validators.
+    patch_cache_control(response, max_age=0)
+    patch_vary_headers(response, ("Cookie", "Accept-Encoding"))
+    return response
+
+
+def _cached_response(request, entry):
+    body, content_type = entry
+    if re_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+        response = HttpResponse(body, content_type=content_type)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(
+            gzip.decompress(body), content_type=content_type
+        )
+    response["Content-Length"] = str(len(response.content))
+    return response
+
+
+def _is_cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header("Content-Encoding")
+        and getattr(response, "cache_tags", None) is not None
+        # A page with a CSRF token must not be shared.
+        and not request.META.get("CSRF_COOKIE_USED")
+    )
+
+
+def _validators(path, versions):
+    digest = hashlib.md5(
+        "|".join([path, *map(repr, versions)]).encode()
+    ).hexdigest()
+    # Weak, as the same page is served with and without gzip.
+    return f'W/"{digest}"', int(max(versions, default=0))
+
+
+def _render_and_cache(view, request, key, *args, **kwargs):
+    started = _render_started.get()
+    response = view(request, *args, **kwargs)
+    if not _is_cacheable(request, response):
+        return response
+    # Personal parts of an anonymous page are the same for every guest,
+    # so they are stored already filled in.
+    response.content = holes.fill(response.content, request)
+    # The tags are only known now; a version newer than the start means
+    # an invalidation landed while the page was rendered.
+    versions = get_versions(*response.cache_tags)
+    if max(versions, default=0) > started:
+        return response
+    page = (compress_string(response.content), response["Content-Type"])
+    set_tagged(
+        key, page, response.cache_tags, get_timeout(), versions=versions
+    )
+    etag, last_modified = _validators(request.get_full_path(), versions)
+    return _set_validators(response, etag, last_modified)
+
+
+def cache_anonymous_page(view):
+    """
+    Кэширует ответ представления целиком для анонимных пользователей.
+
+    Представление отмечает ответ тегами через tag_response(). Новейшая
+    из версий тегов становится Last-Modified, а их сочетание с адресом —
+    ETag, поэтому на условный запрос к закэшированной странице ответ 304
+    отдаётся без обращения к представлению и к базе.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated):
+            return view(request, *args, **kwargs)
+        path = request.get_full_path()
+        key = PAGE_KEY.format(hashlib.md5(path.encode()).hexdigest())
+
+        entry = get_tagged(key)
+        if entry is not None:
+            page, versions = entry
+            etag, last_modified = _validators(path, versions)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = _cached_response(request, page)
+            return _set_validators(response, etag, last_modified)
+
+        token = _render_started.set(time.time())
+        try:
+            return _render_and_cache(view, request, key, *args, **kwargs)
+        finally:
+            _render_started.reset(token)
+
+    return wrapper
@@ -0,0 +1,165 @@
+"""
+Движки ленты подписок.
+
+Движок выбирается настройкой POSTS_FEED_ENGINE:
+
+* "timeline" — материализованные ленты (см. posts.timeline);
+* "merge" — слияние закэшированных списков постов авторов;
+* "query" — подзапрос по подпискам без какой-либо подготовки.
+
+Материализованные ленты ведутся только при "timeline" (отписки
+вычищаются из них всегда). Поэтому при переходе на "timeline" с другого
+движка ленты нужно пересобрать командой `manage.py rebuild_timelines`,
+иначе в них не будет постов и подписок, появившихся за это время.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+
+from .models import Follow, Post
+
+ENGINES = ("timeline", "merge", "query")
+
+# Every engine exposes the date a post entered the feed as feed_date and
+# the post id as feed_id, so the feed is paginated by the same key
+# whatever the engine. The timeline takes the id from its own rows, so
+# the whole key is read from its index.
+FEED_KEYS = ("feed_date", "feed_id")
+
+AUTHOR_POSTS_KEY = "posts:author_posts:{}"
+AUTHOR_POSTS_TIMEOUT = 60 * 60
+AUTHOR_POSTS_DEPTH = 200
+LOAD_CHUNK_SIZE = 500
+
+
+def get_engine():
+    engine = getattr(settings, "POSTS_FEED_ENGINE", "timeline")
+    if engine not in ENGINES:
+        raise ImproperlyConfigured(
+            f"POSTS_FEED_ENGINE must be one of {ENGINES}, not {engine!r}"
+        )
+    return engine
+
+
+def _load_author_posts(author_ids):
+    """
+    Возвращает для каждого автора список (timestamp, pk) его последних
+    постов, от новых к старым. Промахи кэша добираются порциями.
+    """
+    keys = {AUTHOR_POSTS_KEY.format(author_id): author_id
+            for author_id in author_ids}
+    lists = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    missing = [author_id for author_id in author_ids
+               if author_id not in lists]
+    depth = getattr(settings, "POSTS_FEED_AUTHOR_DEPTH", AUTHOR_POSTS_DEPTH)
+
+    for start in range(0, len(missing), LOAD_CHUNK_SIZE):
+        chunk = missing[start:start + LOAD_CHUNK_SIZE]
+        loaded = {author_id: [] for author_id in chunk}
+        rows = Post.objects.filter(author_id__in=chunk).order_by(
+            "-pub_date", "-pk"
+        ).values_list("author_id", "pub_date", "pk")
+        for author_id, pub_date, pk in rows.iterator():
+            author_posts = loaded[author_id]
+            if len(author_posts) < depth:
+                author_posts.append((pub_date.timestamp(), pk))
+        cache.set_many(
+            {AUTHOR_POSTS_KEY.format(author_id): author_posts
+             for author_id, author_posts in loaded.items()},
+            AUTHOR_POSTS_TIMEOUT,
+        )
+        lists.update(loaded)
+    return lists
+
+
+def invalidate_author(author_id):
+    cache.delete(AUTHOR_POSTS_KEY.format(author_id))
+
+
+class MergedFeed:
+    """
+    Лента, собираемая k-way слиянием списков постов авторов через кучу.
+
+    Ведёт себя как последовательность, поэтому подходит для Paginator;
+    из базы загружаются только посты выбранной страницы.
+    """
+
+    def __init__(self, author_ids):
+        self.author_ids = list(author_ids)
+        self._lists = None
+
+    @property
+    def lists(self):
+        if self._lists is None:
+            self._lists = list(
+                _load_author_posts(self.author_ids).values()
+            )
+        return self._lists
+
+    def count(self):
+        return sum(len(author_posts) for author_posts in self.lists)
+
+    def __len__(self):
+        return self.count()
+
+    def merged(self):
+        return heapq.merge(*self.lists, reverse=True)
+
+    def load(self, keys):
+        pks = [pk for _, pk in keys]
+        posts = Post.objects.select_related("author", "group").in_bulk(pks)
+        # Cached lists can outlive a deleted post for a moment.
+        page = [posts[pk] for pk in pks if pk in posts]
+        for post in page:
+            post.feed_date = post.pub_date
+            post.feed_id = post.pk
+        return page
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        return self.load(islice(self.merged(), index.start, index.stop))
+
+    def seek(self, key, direction, limit):
+        """Поиск по ключу (pub_date, pk) для CursorPaginator."""
+        key = (key[0].timestamp(), key[1])
+        if direction == "next":
+            older = (
+                item for item in self.merged() if item < key
+            )
+            return self.load(islice(older, limit))
+        newer = (
+            item for author_posts in self.lists
+            for item in author_posts if item > key
+        )
+        return self.load(heapq.nsmallest(limit, newer))
+
+
+def follow_feed(user):
+    """Возвращает ленту подписок пользователя для выбранного движка."""
+    engine = get_engine()
+    if engine == "merge":
+        return MergedFeed(
+            Follow.objects.filter(user=user).values_list(
+                "author_id", flat=True
+            )
+        )
+    if engine == "timeline":
+        return Post.objects.filter(
+            timeline_entries__user=user
+        ).select_related("author", "group").annotate(
+            feed_date=F("timeline_entries__pub_date"),
+            feed_id=F("timeline_entries__post_id"),
+        ).order_by("-feed_date", "-feed_id")
+    authors = Follow.objects.filter(user=user).values_list("author")
+    return Post.objects.filter(
+        author__in=authors
+    ).select_related("author", "group").annotate(
+        feed_date=F("pub_date"), feed_id=F("pk")
+    ).order_by("-feed_date", "-feed_id")
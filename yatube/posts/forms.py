@@ -1,16 +1,56 @@
-from django.forms import ModelForm
+from django import forms
+from django.forms import ModelForm, ValidationError
 
-from .models import Comment, Post
+from .models import Comment, Group, Post, Upload, User
 
 
 class PostForm(ModelForm):
+    """
+    Форма поста. Вместо файла в поле image можно передать upload —
+    завершённую загрузку по частям (см. posts.uploads).
+    """
+
+    def __init__(self, *args, upload=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload = upload
+
     class Meta:
         model = Post
         fields = ("group", "text", "image")
         localized_fields = "__all__"
 
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.upload is None:
+            return cleaned_data
+        if self.upload.status != Upload.COMPLETE:
+            raise ValidationError("Картинка ещё не загружена до конца")
+        if "image" in self.files:
+            self.add_error("image", "Картинка уже загружена по частям")
+        return cleaned_data
+
 
 class CommentForm(ModelForm):
     class Meta:
         model = Comment
         fields = ("text", )
+
+
+class SearchForm(forms.Form):
+    """Поиск по текстам постов с фильтрами по группе и автору."""
+
+    q = forms.CharField(label="Найти", max_length=200, required=False)
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        to_field_name="slug",
+        required=False,
+        label="Группа",
+        empty_label="Все группы",
+    )
+    author = forms.ModelChoiceField(
+        User.objects.all(),
+        to_field_name="username",
+        required=False,
+        label="Автор",
+        widget=forms.TextInput,
+    )
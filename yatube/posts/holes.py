@@ -0,0 +1,36 @@
+"""
+«Дырявый» кэш: общие для всех пользователей фрагменты страниц
+кэшируются один раз, а персональные части (кнопка редактирования,
+меню пользователя) оставляются в них метками и дорисовываются
+HolePunchMiddleware после рендеринга.
+
+Метка хранит имя шаблона и его контекст. Подделать её через
+пользовательский текст нельзя: экранирование превращает «<» в &lt;.
+"""
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+
+PREFIX = b"<!--hole:"
+MARKER = re.compile(rb"<!--hole:([A-Za-z0-9_\-]+=*)-->")
+
+
+def marker(template_name, context):
+    payload = json.dumps([template_name, context]).encode()
+    return f"<!--hole:{base64.urlsafe_b64encode(payload).decode()}-->"
+
+
+def fill(content, request):
+    """Заменяет метки в content результатом рендеринга для request."""
+
+    def render(match):
+        template_name, context = json.loads(
+            base64.urlsafe_b64decode(match.group(1))
+        )
+        return render_to_string(
+            template_name, context, request=request
+        ).encode()
+
+    return MARKER.sub(render, content)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import placeholders
+
+
+class Command(BaseCommand):
+    help = "Создаёт недостающие заглушки картинок постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=placeholders.BATCH_SIZE,
+            help="Сколько постов обрабатывать за раз.",
+        )
+
+    def handle(self, *args, **options):
+        processed = placeholders.backfill(options["chunk_size"])
+        self.stdout.write(f"Обработано постов: {processed}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import activity
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает число комментариев и время последней "
+            "активности постов.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=activity.BATCH_SIZE,
+            help="Сколько постов пересчитывать за раз.",
+        )
+
+    def handle(self, *args, **options):
+        processed = activity.backfill(options["chunk_size"])
+        self.stdout.write(f"Пересчитано постов: {processed}")
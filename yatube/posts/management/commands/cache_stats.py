@@ -0,0 +1,35 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает, как часто кэш отдаёт устаревшие значения, пока "
+        "одно из обращений их пересчитывает."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--alias",
+            default="default",
+            help="Псевдоним кэша из настройки CACHES.",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Обнулить счётчики после вывода.",
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[options["alias"]]
+        if not hasattr(cache, "stats"):
+            raise CommandError(
+                f"Кэш {options['alias']} не собирает статистику."
+            )
+        counts = cache.stats()
+        for name, value in counts.items():
+            if isinstance(value, float):
+                value = f"{value:.2%}"
+            self.stdout.write(f"{name}: {value}")
+        if options["reset"]:
+            cache.reset_stats()
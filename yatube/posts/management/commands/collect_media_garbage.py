@@ -0,0 +1,170 @@
+import hashlib
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails, uploads
+from posts.models import MediaBlob, Post
+
+
+def fingerprint(name):
+    # Eight bytes per path keep the referenced set small; a collision
+    # can only make a file survive, never get deleted.
+    return hashlib.blake2b(name.encode(), digest_size=8).digest()
+
+
+def walk(storage, directory):
+    """Файлы каталога directory хранилища: (имя, размер, mtime)."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(storage.path(current)))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            name = f"{current}/{entry.name}" if current else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(name)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                yield name, stat.st_size, stat.st_mtime
+
+
+class Command(BaseCommand):
+    help = ("Удаляет картинки постов и миниатюры, на которые больше "
+            "не ссылается ни один пост, и старые загрузки по частям.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать, что было бы удалено.",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=24 * 60 * 60,
+            help="Не трогать файлы моложе стольких секунд.",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=100,
+            help="Не больше стольких удалений в секунду; 0 — без "
+                 "ограничения.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Сколько файлов удалять за раз.",
+        )
+        parser.add_argument(
+            "--upload-max-age",
+            type=int,
+            default=None,
+            help="Удалять загрузки по частям старше стольких секунд; по "
+                 "умолчанию POSTS_UPLOAD_MAX_AGE.",
+        )
+
+    def referenced(self):
+        """Отпечатки имён картинок постов и всех их миниатюр."""
+        originals = set()
+        thumbnail_files = set()
+        names = Post.objects.exclude(image="").exclude(
+            image__isnull=True
+        ).order_by().values_list("image", flat=True).distinct()
+        for name in names.iterator():
+            originals.add(fingerprint(name))
+            thumbnail_files.update(
+                map(fingerprint, thumbnails.thumbnail_names(name))
+            )
+        return originals, thumbnail_files
+
+    def delete_originals(self, storage, batch):
+        names = [name for name, _ in batch]
+        # Posts created since the scan started may use these files.
+        used = set(
+            Post.objects.filter(image__in=names).values_list(
+                "image", flat=True
+            )
+        )
+        deleted = [(name, size) for name, size in batch if name not in used]
+        for name, _ in deleted:
+            storage.delete(name)
+            default.kvstore.delete(ImageFile(name, storage))
+        MediaBlob.objects.filter(
+            name__in=[name for name, _ in deleted]
+        ).delete()
+        return deleted
+
+    def delete_thumbnails(self, storage, batch):
+        for name, _ in batch:
+            storage.delete(name)
+            # Otherwise sorl would keep serving the missing file.
+            default.kvstore.delete(
+                ImageFile(name, storage), delete_thumbnails=False
+            )
+        return batch
+
+    def sweep(self, storage, directory, keep, delete, options):
+        """Удаляет файлы directory не из keep; возвращает число и байты."""
+        cutoff = time.time() - options["min_age"]
+        count = reclaimed = 0
+        batch = []
+
+        def flush():
+            nonlocal count, reclaimed
+            started = time.monotonic()
+            done = batch if options["dry_run"] else delete(storage, batch)
+            count += len(done)
+            reclaimed += sum(size for _, size in done)
+            if options["rate"] and not options["dry_run"]:
+                pause = len(batch) / options["rate"]
+                time.sleep(max(0, pause - (time.monotonic() - started)))
+            batch.clear()
+
+        for name, size, mtime in walk(storage, directory):
+            if mtime > cutoff or fingerprint(name) in keep:
+                continue
+            batch.append((name, size))
+            if len(batch) >= options["batch_size"]:
+                flush()
+        if batch:
+            flush()
+        return count, reclaimed
+
+    def handle(self, *args, **options):
+        originals, thumbnail_files = self.referenced()
+        # Thumbnails go first, so their bytes are counted before sorl
+        # would remove them together with the originals.
+        thumbnail_count, thumbnail_bytes = self.sweep(
+            default.storage,
+            thumbnail_settings.THUMBNAIL_PREFIX.rstrip("/"),
+            thumbnail_files,
+            self.delete_thumbnails,
+            options,
+        )
+        field = Post._meta.get_field("image")
+        original_count, original_bytes = self.sweep(
+            field.storage,
+            field.upload_to.rstrip("/"),
+            originals,
+            self.delete_originals,
+            options,
+        )
+        upload_count = uploads.expire(
+            options["upload_max_age"], dry_run=options["dry_run"]
+        )
+        prefix = "Было бы удалено" if options["dry_run"] else "Удалено"
+        self.stdout.write(
+            f"{prefix}: картинок {original_count}, "
+            f"миниатюр {thumbnail_count}, "
+            f"загрузок {upload_count}, "
+            f"освобождено байт: {original_bytes + thumbnail_bytes}"
+        )
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                as_completed, wait)
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def generate_chunk(names):
+    """
+    Создаёт миниатюры картинок names. Возвращает число обработанных
+    картинок и список (имя, ошибка) для тех, что не удались.
+    """
+    failed = []
+    for name in names:
+        try:
+            thumbnails.generate(name)
+        except Exception as error:
+            # A missing or broken original must not stop the backfill.
+            failed.append((name, repr(error)))
+    return len(names), failed
+
+
+class Command(BaseCommand):
+    help = "Создаёт недостающие миниатюры картинок всех постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Число процессов; по умолчанию по числу ядер.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=50,
+            help="Сколько картинок отдавать процессу за раз.",
+        )
+
+    def chunks(self, chunk_size):
+        images = Post.objects.exclude(image="").exclude(
+            image__isnull=True
+        ).order_by("pk").values_list("pk", "image")
+        last_pk = 0
+        while True:
+            chunk = list(images.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            yield [name for _, name in chunk]
+
+    def handle(self, *args, **options):
+        self.processed = self.failed = 0
+        chunks = self.chunks(options["chunk_size"])
+        first = next(chunks, None)
+        if first is not None:
+            self.run(first, chunks, options["processes"])
+        self.stdout.write(
+            f"Готово, картинок: {self.processed}, с ошибками: {self.failed}"
+        )
+
+    def run(self, first, chunks, processes):
+        # Forked workers must not share the parent's connections. With
+        # fork all of them are started by the first submit, after which
+        # the parent reads the next chunks only as workers free up.
+        connections.close_all()
+        processes = processes or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("fork")
+        )
+        # A few chunks per worker keep it busy without queueing them all.
+        window = 2 * processes
+        with pool:
+            pending = {pool.submit(generate_chunk, first)}
+            for chunk in chunks:
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self.report(done)
+                pending.add(pool.submit(generate_chunk, chunk))
+            self.report(as_completed(pending))
+
+    def report(self, futures):
+        for future in futures:
+            count, failed = future.result()
+            self.processed += count
+            self.failed += len(failed)
+            for name, error in failed:
+                self.stderr.write(f"{name}: {error}")
+            self.stdout.write(f"Обработано картинок: {self.processed}")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Заново строит полнотекстовый индекс постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=search.BATCH_SIZE,
+            help="Сколько постов индексировать за раз.",
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("В этой базе нет индекса FTS5")
+        indexed = search.rebuild(options["chunk_size"])
+        self.stdout.write(f"Проиндексировано постов: {indexed}")
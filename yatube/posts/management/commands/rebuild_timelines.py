@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Пересобирает ленты подписок из существующих подписок и постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Пересобрать ленты только этих пользователей.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=timeline.BATCH_SIZE,
+            help="Сколько подписок обрабатывать в одной транзакции.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["usernames"]:
+            user_ids = list(
+                User.objects.filter(
+                    username__in=options["usernames"]
+                ).values_list("pk", flat=True)
+            )
+        processed = timeline.rebuild(user_ids, options["chunk_size"])
+        self.stdout.write(f"Обработано подписок: {processed}")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики подписчиков, подписок и постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=stats.BATCH_SIZE,
+            help="Сколько пользователей пересчитывать за раз.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        users = User.objects.order_by("pk").values_list("pk", flat=True)
+        processed = 0
+        last_pk = 0
+        while True:
+            chunk = list(users.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            stats.recount(chunk, chunk_size)
+            processed += len(chunk)
+            last_pk = chunk[-1]
+        self.stdout.write(f"Пересчитано пользователей: {processed}")
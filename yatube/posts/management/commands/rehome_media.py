@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import caching, media, thumbnails
+from posts.models import Post
+from posts.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = ("Переносит картинки постов из плоского каталога в хранилище "
+            "по содержимому. Прерванный перенос можно запустить заново.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="Сколько постов переносить за раз.",
+        )
+        parser.add_argument(
+            "--keep-originals",
+            action="store_true",
+            help="Не удалять исходные файлы после переноса.",
+        )
+
+    def chunks(self, chunk_size):
+        images = Post.objects.exclude(image="").exclude(
+            image__isnull=True
+        ).order_by("pk").values_list("pk", "image")
+        last_pk = 0
+        while True:
+            chunk = list(images.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1][0]
+            # Already moved posts are skipped, which makes reruns cheap.
+            yield [
+                name for _, name in chunk if not is_content_addressed(name)
+            ]
+
+    def rehome(self, storage, name):
+        """Переносит файл name; возвращает новое имя или None."""
+        if not storage.exists(name):
+            self.stderr.write(f"Нет файла: {name}")
+            return None
+        with storage.open(name) as file_:
+            # Streamed from disk to disk chunk by chunk.
+            new_name = storage.save(name, file_)
+        with transaction.atomic():
+            moved = list(
+                Post.objects.select_for_update().filter(
+                    image=name
+                ).values_list("pk", flat=True)
+            )
+            Post.objects.filter(pk__in=moved).update(image=new_name)
+            if moved:
+                media.acquire(new_name, count=len(moved))
+        caching.invalidate_tags(*map(caching.post_tag, moved))
+        return new_name
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field("image").storage
+        moved = 0
+        for names in self.chunks(options["chunk_size"]):
+            for name in dict.fromkeys(names):
+                new_name = self.rehome(storage, name)
+                if new_name is None:
+                    continue
+                # Thumbnails are keyed by the source name.
+                thumbnails.generate(new_name)
+                if not options["keep_originals"]:
+                    storage.delete(name)
+                moved += 1
+            self.stdout.write(f"Перенесено файлов: {moved}")
+        self.stdout.write(f"Готово, файлов: {moved}")
@@ -0,0 +1,41 @@
+"""
+Счётчики ссылок на файлы картинок в хранилище по содержимому.
+
+Одинаковые картинки разных постов хранятся одним файлом (см.
+posts.storage), поэтому удалить файл можно, только когда на него не
+ссылается ни один пост. Сигналы Post вызывают acquire() и release() при
+смене и удалении картинки; файлы без ссылок удаляет сборщик мусора.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MediaBlob, Post
+from .storage import is_content_addressed
+
+
+def acquire(name, count=1):
+    """Добавляет count ссылок на файл name."""
+    if not is_content_addressed(name):
+        return
+    blobs = MediaBlob.objects.filter(name=name)
+    if blobs.update(refcount=F("refcount") + count, released=None):
+        return
+    storage = Post._meta.get_field("image").storage
+    _, created = MediaBlob.objects.get_or_create(
+        name=name,
+        defaults={"size": storage.size(name), "refcount": count},
+    )
+    if not created:
+        # Another process has just created it.
+        blobs.update(refcount=F("refcount") + count, released=None)
+
+
+def release(name):
+    """Убирает ссылку на файл name и помечает файл без ссылок."""
+    if not is_content_addressed(name):
+        return
+    blobs = MediaBlob.objects.filter(name=name)
+    blobs.filter(refcount__gt=0).update(refcount=F("refcount") - 1)
+    blobs.filter(refcount=0, released__isnull=True).update(
+        released=timezone.now()
+    )
@@ -0,0 +1,17 @@
+from . import holes
+
+
+class HolePunchMiddleware:
+    """Дорисовывает персональные части страницы (см. posts.holes)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (not response.streaming
+                and not response.has_header("Content-Encoding")
+                and response.get("Content-Type", "").startswith("text/html")
+                and holes.PREFIX in response.content):
+            response.content = holes.fill(response.content, request)
+        return response
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:05
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Q
+
+BATCH_SIZE = 100
+
+
+def deduplicate_follows(apps, schema_editor):
+    """Оставляет по одной подписке на каждую пару (user, author)."""
+    Follow = apps.get_model("posts", "Follow")
+    duplicates = Follow.objects.values("user", "author").annotate(
+        keep=Min("pk"),
+        copies=Count("pk"),
+    ).filter(copies__gt=1).order_by()
+
+    batch = []
+    for row in duplicates.iterator():
+        batch.append(
+            Q(user=row["user"], author=row["author"]) & ~Q(pk=row["keep"])
+        )
+        if len(batch) == BATCH_SIZE:
+            Follow.objects.filter(_any(batch)).delete()
+            batch = []
+    if batch:
+        Follow.objects.filter(_any(batch)).delete()
+
+
+def _any(conditions):
+    condition = Q()
+    for other in conditions:
+        condition |= other
+    return condition
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_follows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:02
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_activity(apps, schema_editor):
+    # Comment deletes decrement the counter, so it must start exact.
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    comments = Comment.objects.filter(post=OuterRef("pk")).order_by()
+    total = comments.values("post").annotate(total=Count("pk"))
+    latest = comments.order_by("-created").values("created")[:1]
+    Post.objects.update(
+        comments_count=Coalesce(
+            Subquery(total.values("total"),
+                     output_field=models.PositiveIntegerField()),
+            0,
+        ),
+        last_activity=Coalesce(
+            Subquery(latest, output_field=models.DateTimeField()),
+            F("pub_date"),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(
+            fill_activity,
+            migrations.RunPython.noop,
+        ),
+    ]
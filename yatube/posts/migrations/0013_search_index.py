@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-17 06:45
+
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+TABLE = "posts_post_fts"
+
+
+def create_index(apps, schema_editor):
+    # Without FTS5 posts.search falls back to icontains.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {TABLE} USING fts5("
+                f"text, tokenize = 'unicode61', prefix = '2 3')"
+            )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        f"INSERT INTO {TABLE} (rowid, text) SELECT id, text FROM posts_post"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_upload'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
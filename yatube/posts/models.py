@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -17,6 +20,13 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets signal handlers drop caches tagged with the old slug.
+        instance.loaded_slug = instance.__dict__.get("slug")
+        return instance
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -40,17 +50,65 @@ class Post(models.Model):
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
         help_text="Загрузите картинку",
         verbose_name="Изображение (необязательно)"
     )
+    # Filled by posts.placeholders when thumbnails are generated.
+    image_placeholder = models.TextField(
+        blank=True, default="", editable=False
+    )
+    # Maintained by Comment signals with F() updates.
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    last_activity = models.DateTimeField(default=timezone.now, editable=False)
+
+    COUNTER_FIELDS = ("comments_count", "last_activity")
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets signal handlers see which group an edited post has left
+        # and which image it has dropped.
+        instance.loaded_group_id = instance.__dict__.get("group_id")
+        if "image" in instance.__dict__:
+            instance.loaded_image = instance.__dict__["image"] or ""
+        return instance
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # A stale instance (e.g. in edit_post) must not overwrite
+            # counters that were moved while it was loaded.
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ("-pub_date",)
+        # Ascending on purpose: listings are read backwards in
+        # (-pub_date, -id) order, and the id tie-break comes from the
+        # index for free only when both columns run the same way.
+        indexes = (
+            models.Index(
+                fields=("pub_date",),
+                name="post_pub_date_idx",
+            ),
+            models.Index(
+                fields=("author", "pub_date"),
+                name="post_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=("group", "pub_date"),
+                name="post_group_pub_date_idx",
+            ),
+        )
 
 
 class Comment(models.Model):
@@ -70,6 +128,14 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("post", "created"),
+                name="comment_post_created_idx",
+            ),
+        )
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -82,3 +148,106 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="following"
     )
+
+    class Meta:
+        # The constraint's index also covers lookups by user; lookups
+        # by author use the implicit foreign key index.
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "author"),
+                name="unique_follow",
+            ),
+        )
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries"
+    )
+    # Copy of post.pub_date, so the feed is read by one range scan
+    # over (user, pub_date, post) without touching the posts table.
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ("-pub_date",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "post"),
+                name="unique_timeline_entry",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("user", "-pub_date", "-post"),
+                name="timeline_user_pub_date_idx",
+            ),
+        )
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0)
+
+
+class MediaBlob(models.Model):
+    """Файл картинки в хранилище по содержимому и число ссылок на него."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    # When the last post let go of the file; the file itself is removed
+    # later by garbage collection.
+    released = models.DateTimeField(blank=True, null=True)
+
+
+class Upload(models.Model):
+    """Картинка, загружаемая по частям (см. posts.uploads)."""
+
+    PENDING = "pending"
+    COMPLETE = "complete"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "Загружается"),
+        (COMPLETE, "Загружена"),
+        (PROCESSING, "Обрабатывается"),
+        (READY, "Готова"),
+        (FAILED, "Ошибка"),
+    )
+
+    token = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="uploads"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="uploads"
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(
+        max_length=16, choices=STATUSES, default=PENDING
+    )
+    error = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
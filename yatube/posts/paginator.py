@@ -0,0 +1,245 @@
+"""
+Постраничный вывод с поиском по ключу (keyset pagination).
+
+Вместо OFFSET страницы после первой выбираются условием по паре
+(дата публикации, id) предыдущей страницы, а вместо COUNT(*) на каждом
+запросе наличие следующей страницы определяется по лишней строке.
+Ссылки ?page=N продолжают работать через OFFSET.
+
+Первым полем ключа может быть и число, например релевантность в
+результатах поиска (см. posts.search).
+"""
+import base64
+import binascii
+import hashlib
+import json
+from math import ceil
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+PER_PAGE = 10
+ON_EACH_SIDE = 2
+ON_ENDS = 1
+COUNT_KEY = "posts:paginator_count:{}"
+COUNT_TIMEOUT = 60
+
+NEXT = "next"
+PREVIOUS = "prev"
+
+
+def encode_cursor(values, number, direction):
+    first = values[0]
+    if hasattr(first, "isoformat"):
+        first = first.isoformat()
+    data = json.dumps([first, values[1], number, direction])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор; для испорченного курсора возвращает None."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        first, pk, number, direction = json.loads(
+            base64.urlsafe_b64decode(padded.encode())
+        )
+        if isinstance(first, str):
+            first = parse_datetime(first)
+        elif isinstance(first, bool) or not isinstance(first, (int, float)):
+            first = None
+    except (binascii.Error, TypeError, ValueError):
+        return None
+    if (first is None or not isinstance(pk, int)
+            or not isinstance(number, int) or number < 1
+            or direction not in (NEXT, PREVIOUS)):
+        return None
+    return (first, pk), number, direction
+
+
+class CursorPaginator(Paginator):
+    """
+    Paginator, выбирающий страницы по ключу keys = (дата, id).
+
+    object_list — queryset или объект с методом seek(key, direction,
+    limit) (см. posts.feeds.MergedFeed). Оба поля ключа должны быть
+    доступны и как lookups, и как атрибуты объектов.
+
+    base_query — параметры запроса без page и cursor (с завершающим
+    «&»), которые сохраняются в ссылках на другие страницы.
+    """
+
+    def __init__(self, object_list, per_page=PER_PAGE,
+                 keys=("pub_date", "pk"), base_query="", **kwargs):
+        if hasattr(object_list, "order_by"):
+            # Offset pages must agree with the seek order.
+            object_list = object_list.order_by(
+                f"-{keys[0]}", f"-{keys[1]}"
+            )
+        super().__init__(object_list, per_page, **kwargs)
+        self.keys = keys
+        self.base_query = base_query
+        self._window = None
+        self._page = None
+        # Cursor pages know their neighbours from the fetch itself and
+        # only use a count that is already cached.
+        self._by_offset = True
+
+    def _count_key(self):
+        query = getattr(self.object_list, "query", None)
+        if query is None:
+            return None
+        return COUNT_KEY.format(hashlib.md5(str(query).encode()).hexdigest())
+
+    @cached_property
+    def count(self):
+        key = self._count_key()
+        if key is None:
+            return super().count
+        # The exact number is only needed to draw page links, so it is
+        # shared between requests for a short while.
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, COUNT_TIMEOUT)
+        return count
+
+    def _known_count(self):
+        """Число объектов, если его не нужно считать заново, иначе None."""
+        if "count" in self.__dict__:
+            return self.count
+        key = self._count_key()
+        return None if key is None else cache.get(key)
+
+    @property
+    def num_pages(self):
+        count = self.count if self._by_offset else self._known_count()
+        if count is None:
+            total = 0
+        elif count == 0 and not self.allow_empty_first_page:
+            total = 0
+        else:
+            hits = max(1, count - self.orphans)
+            total = ceil(hits / self.per_page)
+        if self._window is None:
+            return total
+        # What the last fetch has seen beats the cached count.
+        number, has_next = self._window
+        return max(total, number + 1) if has_next else number
+
+    def key_of(self, obj):
+        return tuple(getattr(obj, name) for name in self.keys)
+
+    def _seek(self, key, direction, limit):
+        if hasattr(self.object_list, "seek"):
+            return self.object_list.seek(key, direction, limit)
+        date_field, pk_field = self.keys
+        if direction == NEXT:
+            lookup, ordering = "lt", (f"-{date_field}", f"-{pk_field}")
+        else:
+            lookup, ordering = "gt", (date_field, pk_field)
+        condition = (
+            Q(**{f"{date_field}__{lookup}": key[0]})
+            | Q(**{date_field: key[0], f"{pk_field}__{lookup}": key[1]})
+        )
+        return list(
+            self.object_list.filter(condition).order_by(*ordering)[:limit]
+        )
+
+    @cached_property
+    def page_links(self):
+        """
+        Ссылки виджета страниц: первые и последние ON_ENDS страниц и
+        ON_EACH_SIDE страниц вокруг текущей. Элементы — пары
+        (номер, query string), None обозначает пропуск.
+        """
+        page = self._page
+        last = self.num_pages
+        numbers = sorted(
+            set(range(1, min(ON_ENDS, last) + 1))
+            | set(range(max(1, page.number - ON_EACH_SIDE),
+                        min(last, page.number + ON_EACH_SIDE) + 1))
+            | set(range(max(1, last - ON_ENDS + 1), last + 1))
+        )
+        links = []
+        for number in numbers:
+            if links and number - links[-1][0] > 1:
+                links.append(None)
+            if number == page.number - 1 and page.previous_cursor:
+                query = f"cursor={page.previous_cursor}"
+            elif number == page.number + 1 and page.next_cursor:
+                query = f"cursor={page.next_cursor}"
+            else:
+                query = f"page={number}"
+            links.append((number, query))
+        return links
+
+    def _make_page(self, rows, number, has_next):
+        self._window = (number, has_next)
+        page = self._page = Page(rows, number, self)
+        page.next_cursor = page.previous_cursor = None
+        if rows and has_next:
+            page.next_cursor = encode_cursor(
+                self.key_of(rows[-1]), number + 1, NEXT
+            )
+        if rows and number > 1:
+            page.previous_cursor = encode_cursor(
+                self.key_of(rows[0]), number - 1, PREVIOUS
+            )
+        return page
+
+    def _offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            # Paginator.get_page() shows the last page for out-of-range
+            # numbers; fall back to the first one if the count is stale.
+            last = self.num_pages
+            return self._offset_page(last if last < number else 1)
+        return self._make_page(
+            rows[:self.per_page], number, len(rows) > self.per_page
+        )
+
+    def _cursor_page(self, key, number, direction):
+        self._by_offset = False
+        rows = self._seek(key, direction, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == NEXT:
+            if not rows:
+                return self._offset_page(1)
+            return self._make_page(rows, number, has_more)
+        if not has_more:
+            # Reached the top of the list.
+            return self._offset_page(1)
+        return self._make_page(rows[::-1], max(number, 2), True)
+
+    def page(self, number):
+        return self._offset_page(self.validate_number(number))
+
+    def get_page(self, number=None, cursor=None):
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is not None:
+                return self._cursor_page(*position)
+        try:
+            number = max(1, int(number))
+        except (TypeError, ValueError):
+            number = 1
+        return self._offset_page(number)
+
+
+def paginate(request, object_list, **kwargs):
+    """Возвращает страницу object_list по параметрам ?page= и ?cursor=."""
+    params = request.GET.copy()
+    params.pop("page", None)
+    params.pop("cursor", None)
+    if params:
+        kwargs.setdefault("base_query", params.urlencode() + "&")
+    paginator = CursorPaginator(object_list, **kwargs)
+    return paginator.get_page(
+        request.GET.get("page"),
+        cursor=request.GET.get("cursor"),
+    )
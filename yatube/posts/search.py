@@ -0,0 +1,252 @@
+"""
+Полнотекстовый поиск по текстам постов.
+
+На SQLite тексты лежат в индексе FTS5 (таблица TABLE, rowid — id
+поста), который поддерживают сигналы Post (см. posts.signals), а
+результаты упорядочены по релевантности bm25 (столбец rank). Правки в
+обход сигналов (QuerySet.update, raw SQL) в индекс не попадают; его
+можно пересобрать командой `manage.py rebuild_search_index`.
+
+Без FTS5 (другая СУБД или SQLite, собранный без него) поиск идёт через
+icontains по каждому слову, и все результаты одинаково релевантны.
+
+В обоих случаях у найденных постов есть атрибут score (больше — выше в
+выдаче), так что результаты листаются по ключу SEARCH_KEYS
+(см. posts.paginator.CursorPaginator). bm25 зависит от всех текстов в
+индексе, поэтому после новых постов и правок score может сдвинуться, и
+следующая страница по старому курсору пропустит или повторит
+несколько результатов.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+TABLE = "posts_post_fts"
+SEARCH_KEYS = ("score", "pk")
+MAX_TERMS = 10
+BATCH_SIZE = 1000
+# Scores are rounded, so that small shifts of bm25 after unrelated writes
+# leave most cursors in place and near-equal scores are ordered by id.
+SCORE_DIGITS = 3
+
+WORD_RE = re.compile(r"\w+")
+
+
+# Whether the index exists, by database; filled on the first check.
+_available = {}
+
+
+def is_available():
+    """Есть ли индекс FTS5 в текущей базе."""
+    key = (connection.alias, connection.settings_dict["NAME"])
+    if key not in _available:
+        _available[key] = (
+            connection.vendor == "sqlite"
+            and TABLE in connection.introspection.table_names()
+        )
+    return _available[key]
+
+
+def forget_availability():
+    """Забывает, есть ли индекс: после миграций его могло не стать."""
+    _available.clear()
+
+
+def get_terms(text):
+    return WORD_RE.findall(text.lower())[:MAX_TERMS]
+
+
+def make_match(terms):
+    """
+    Запрос MATCH: все слова как префиксы. Слова состоят только из \\w,
+    поэтому синтаксис FTS5 в них не проберётся.
+    """
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def index(post):
+    """Добавляет текст поста в индекс или заменяет его."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [post.pk])
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)",
+            [post.pk, post.text],
+        )
+
+
+def remove(post_pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [post_pk])
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """
+    Заново заполняет индекс текстами всех постов порциями по
+    первичному ключу. Возвращает число проиндексированных постов.
+    """
+    indexed = 0
+    last_pk = 0
+    # Searches keep seeing the old index until the new one is complete.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        while True:
+            rows = list(
+                Post.objects.filter(pk__gt=last_pk).order_by(
+                    "pk"
+                ).values_list("pk", "text")[:batch_size]
+            )
+            if not rows:
+                break
+            cursor.executemany(
+                f"INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)", rows
+            )
+            indexed += len(rows)
+            last_pk = rows[-1][0]
+        # Merges the b-trees written batch by batch.
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def matching_pks(text):
+    """
+    Подзапрос с id постов, подходящих под text, для pk__in. None, если
+    индекса нет.
+    """
+    terms = get_terms(text)
+    if not terms or not is_available():
+        return None
+    return RawSQL(
+        f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s",
+        (make_match(terms),),
+    )
+
+
+class SearchResults:
+    """
+    Посты, подходящие под запрос, от более релевантных к менее.
+
+    Ведёт себя как последовательность и поддерживает seek(), поэтому
+    подходит для CursorPaginator с keys=SEARCH_KEYS. Из базы
+    загружаются только посты выбранной страницы.
+    """
+
+    def __init__(self, terms, group=None, author=None):
+        self.match = make_match(terms)
+        self.filters = []
+        if group is not None:
+            self.filters.append(("post.group_id = %s", group.pk))
+        if author is not None:
+            self.filters.append(("post.author_id = %s", author.pk))
+
+    def _from(self):
+        """FROM и WHERE запроса к индексу и их параметры."""
+        sql = f"FROM {TABLE}"
+        if self.filters:
+            sql += (
+                f" JOIN {Post._meta.db_table} AS post"
+                f" ON post.id = {TABLE}.rowid"
+            )
+        sql += f" WHERE {TABLE} MATCH %s"
+        params = [self.match]
+        for condition, value in self.filters:
+            sql += f" AND {condition}"
+            params.append(value)
+        return sql, params
+
+    def _select(self, where=(), order="", limit=None, offset=0):
+        sql, params = self._from()
+        # The rank column (bm25 by default) is only allowed in the query
+        # over the FTS table itself, so the cursor goes to the outer one.
+        sql = (
+            f"SELECT id, score FROM (SELECT {TABLE}.rowid AS id, "
+            f"round(-{TABLE}.rank, {SCORE_DIGITS}) AS score {sql})"
+        )
+        for number, (condition, values) in enumerate(where):
+            sql += f" {'AND' if number else 'WHERE'} {condition}"
+            params.extend(values)
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT %s OFFSET %s"
+            params += [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def count(self):
+        # Without the rank the count never leaves the index.
+        sql, params = self._from()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) {sql}", params)
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def load(self, rows):
+        pks = [pk for pk, _ in rows]
+        posts = Post.objects.select_related("author", "group").in_bulk(pks)
+        page = []
+        for pk, score in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.score = score
+                page.append(post)
+        return page
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        return self.load(self._select(
+            order="score DESC, id DESC",
+            limit=index.stop - start,
+            offset=start,
+        ))
+
+    def seek(self, key, direction, limit):
+        """
+        Поиск по ключу (score, pk) для CursorPaginator. Сравнивается
+        округлённый score, так что курсор переживает небольшие сдвиги
+        bm25, но не любые (см. описание модуля).
+        """
+        score, pk = key
+        if direction == "next":
+            condition = "(score < %s OR score = %s AND id < %s)"
+            order = "score DESC, id DESC"
+        else:
+            condition = "(score > %s OR score = %s AND id > %s)"
+            order = "score, id"
+        return self.load(self._select(
+            where=[(condition, (score, score, pk))],
+            order=order,
+            limit=limit,
+        ))
+
+
+def search(text, group=None, author=None):
+    """
+    Посты, подходящие под text, с фильтрами по группе и автору.
+    Результат листается CursorPaginator с keys=SEARCH_KEYS.
+    """
+    terms = get_terms(text)
+    if not terms:
+        return Post.objects.none().annotate(
+            score=Value(0.0, output_field=FloatField())
+        )
+    if is_available():
+        return SearchResults(terms, group=group, author=author)
+    posts = Post.objects.select_related("author", "group").annotate(
+        score=Value(0.0, output_field=FloatField())
+    )
+    for term in terms:
+        posts = posts.filter(text__icontains=term)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    return posts
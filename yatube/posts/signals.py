@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import activity, caching, feeds, media, search, stats, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def timelines_enabled():
+    return feeds.get_engine() == "timeline"
+
+
+def _group_slugs(*group_ids):
+    group_ids = {group_id for group_id in group_ids if group_id is not None}
+    if not group_ids:
+        return []
+    return Group.objects.filter(pk__in=group_ids).values_list(
+        "slug", flat=True
+    )
+
+
+def _listing_tags(post, *group_ids):
+    """Теги списков, в составе которых есть или был пост."""
+    return [
+        caching.INDEX,
+        caching.author_tag(post.author_id),
+        *map(caching.group_tag, _group_slugs(post.group_id, *group_ids)),
+    ]
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if raw:
+        return
+    if search.is_available() and (
+        update_fields is None or "text" in update_fields
+    ):
+        search.index(instance)
+    old_group_id = getattr(instance, "loaded_group_id", None)
+    tags = [caching.post_tag(instance.pk)]
+    if created:
+        tags += _listing_tags(instance)
+    elif old_group_id != instance.group_id:
+        tags += map(
+            caching.group_tag, _group_slugs(old_group_id, instance.group_id)
+        )
+    # An edit that keeps the group only touches pages showing the post.
+    caching.invalidate_tags(*tags)
+    instance.loaded_group_id = instance.group_id
+    old_image = "" if created else getattr(instance, "loaded_image", None)
+    # Unknown when the image was deferred; then it was not edited either.
+    if old_image is not None and old_image != instance.image.name:
+        if instance.image:
+            media.acquire(instance.image.name)
+        if old_image:
+            media.release(old_image)
+        instance.loaded_image = instance.image.name or ""
+    if not created:
+        return
+    stats.change(instance.author_id, posts_count=1)
+    feeds.invalidate_author(instance.author_id)
+    if timelines_enabled():
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if search.is_available():
+        search.remove(instance.pk)
+    caching.invalidate_tags(
+        caching.post_tag(instance.pk), *_listing_tags(instance)
+    )
+    stats.change(instance.author_id, posts_count=-1)
+    feeds.invalidate_author(instance.author_id)
+    if instance.image:
+        media.release(instance.image.name)
+
+
+@receiver(post_migrate)
+def migrated(sender, **kwargs):
+    # Migrations create or drop the search index.
+    search.forget_availability()
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    stats.change(instance.user_id, following_count=1)
+    stats.change(instance.author_id, followers_count=1)
+    caching.invalidate_tags(
+        caching.user_tag(instance.user_id),
+        caching.user_tag(instance.author_id),
+    )
+    if timelines_enabled():
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.change(instance.user_id, following_count=-1)
+    stats.change(instance.author_id, followers_count=-1)
+    caching.invalidate_tags(
+        caching.user_tag(instance.user_id),
+        caching.user_tag(instance.author_id),
+    )
+    # Cheap enough to run with any engine: a switch back to "timeline"
+    # then never shows posts of authors unfollowed meanwhile.
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        activity.comment_added(instance)
+        caching.invalidate_tags(caching.post_tag(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    activity.comment_removed(instance)
+    caching.invalidate_tags(caching.post_tag(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    slugs = {instance.slug, getattr(instance, "loaded_slug", instance.slug)}
+    # Group titles are shown on post cards everywhere.
+    caching.invalidate_tags(caching.INDEX, *map(caching.group_tag, slugs))
+    instance.loaded_slug = instance.slug
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no page shows.
+    if raw or update_fields == frozenset({"last_login"}):
+        return
+    caching.invalidate_tags(
+        caching.user_tag(instance.pk),
+        caching.author_tag(instance.pk),
+    )
@@ -0,0 +1,82 @@
+"""
+Денормализованные счётчики пользователя: подписчики, подписки, посты.
+
+Счётчики сдвигаются сигналами в той же транзакции, что и изменение.
+Строка создаётся при первом чтении с точным пересчётом; расхождения
+исправляет команда recount_user_stats.
+"""
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Follow, Post, UserStats
+
+BATCH_SIZE = 1000
+
+
+def change(user_id, **deltas):
+    """Сдвигает счётчики существующей строки, например posts_count=1."""
+    UserStats.objects.filter(user_id=user_id).update(**{
+        # Never below zero, even if the counter has drifted.
+        field: F(field) + delta if delta >= 0
+        else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def count(user_ids):
+    """Точные значения счётчиков для пользователей user_ids."""
+    values = {
+        user_id: {
+            "followers_count": 0,
+            "following_count": 0,
+            "posts_count": 0,
+        }
+        for user_id in user_ids
+    }
+    sources = (
+        (Follow.objects, "author", "followers_count"),
+        (Follow.objects, "user", "following_count"),
+        (Post.objects, "author", "posts_count"),
+    )
+    for manager, field, counter in sources:
+        rows = manager.filter(**{f"{field}__in": user_ids}).values(
+            field
+        ).annotate(total=Count("pk")).order_by()
+        for row in rows:
+            values[row[field]][counter] = row["total"]
+    return values
+
+
+def get_stats(user):
+    """Счётчики пользователя; строка создаётся при первом обращении."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user=user,
+            defaults=count([user.pk])[user.pk],
+        )
+        return stats
+
+
+def recount(user_ids, batch_size=BATCH_SIZE):
+    """Пересчитывает счётчики пользователей порциями."""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        values = count(chunk)
+        existing = set(
+            UserStats.objects.filter(user_id__in=chunk).values_list(
+                "user_id", flat=True
+            )
+        )
+        UserStats.objects.bulk_update(
+            [UserStats(user_id=user_id, **values[user_id])
+             for user_id in chunk if user_id in existing],
+            ("followers_count", "following_count", "posts_count"),
+        )
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id, **values[user_id])
+             for user_id in chunk if user_id not in existing],
+            ignore_conflicts=True,
+        )
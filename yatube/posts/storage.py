@@ -0,0 +1,91 @@
+"""
+Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под SHA-256 своего содержимого и раскладывается по
+вложенным каталогам по первым символам хэша:
+
+    posts/3f/a2/3fa2...e9.jpg
+
+Так в одном каталоге оказывается не больше нескольких тысяч файлов, а
+повторная загрузка той же картинки ничего не пишет на диск и получает
+имя уже сохранённого файла. Сколько постов ссылается на файл, считает
+posts.media (модель MediaBlob).
+"""
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+SHARD_WIDTH = 2
+SHARD_DEPTH = 2
+
+HASHED_NAME_RE = re.compile(
+    r"(^|/)" + r"[0-9a-f]{%d}/" % SHARD_WIDTH * SHARD_DEPTH
+    + r"[0-9a-f]{64}(\.\w+)?$"
+)
+
+
+def is_content_addressed(name):
+    """Сохранено ли имя name по хэшу содержимого."""
+    return bool(name) and HASHED_NAME_RE.search(name) is not None
+
+
+def hashed_name(name, digest):
+    """Имя файла с хэшем digest в каталоге, куда просилось имя name."""
+    directory = posixpath.dirname(name)
+    extension = posixpath.splitext(name)[1].lower()
+    shards = [
+        digest[num * SHARD_WIDTH:(num + 1) * SHARD_WIDTH]
+        for num in range(SHARD_DEPTH)
+    ]
+    return posixpath.join(directory, *shards, digest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, называющий файлы по хэшу содержимого."""
+
+    def content_name(self, name, content):
+        # Read in chunks, so large uploads are never held in memory.
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return hashed_name(name, digest.hexdigest())
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        try:
+            # The same bytes may already be stored under this name. A
+            # fresh mtime keeps the garbage collector away until the post
+            # that reuses the file is committed.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            # The hashed name is final: get_available_name() would only
+            # add a suffix to a file with the very same bytes.
+            return self._save(name, content)
+        return name
+
+    def _save(self, name, content):
+        # The bytes go to a temporary file next to the final one and are
+        # moved into place in a single rename. Concurrent uploads of the
+        # same image then end up with one complete file, whoever wins.
+        directory, basename = posixpath.split(name)
+        temporary = super()._save(
+            posixpath.join(directory, f".{basename}.{uuid.uuid4().hex}.tmp"),
+            content,
+        )
+        try:
+            os.replace(self.path(temporary), self.path(name))
+        except OSError:
+            self.delete(temporary)
+            raise
+        return name
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import caching
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TestTagInvalidation(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Описание группы для теста тегов",
+        )
+        cls.author = User.objects.create_user(username="test_dummy_author")
+        cls.reader = User.objects.create_user(username="test_dummy_reader")
+        cls.post = Post.objects.create(
+            text="Пост", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def cache_with(self, *tags):
+        caching.set_tagged("key", "value", tags)
+
+    def rename_group(self):
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = "new_slug"
+        group.save()
+
+    def is_cached(self):
+        return caching.get_tagged("key") is not None
+
+    def test_invalidate_tags_drops_tagged_entries(self):
+        """invalidate_tags сбрасывает записи с любым из своих тегов."""
+        self.cache_with("a", "b")
+        caching.invalidate_tags("c")
+        self.assertTrue(self.is_cached())
+
+        caching.invalidate_tags("b")
+
+        self.assertFalse(self.is_cached())
+
+    def test_model_changes_invalidate_their_tags(self):
+        """Сигналы моделей сбрасывают соответствующие теги."""
+        post_tag = caching.post_tag(self.post.pk)
+        changes = (
+            (post_tag, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text="Комментарий"
+            )),
+            (caching.group_tag(self.group.slug), self.rename_group),
+            (caching.user_tag(self.author.pk), lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            )),
+            (caching.author_tag(self.author.pk), lambda: Post.objects.create(
+                text="Новый пост", author=self.author
+            )),
+        )
+        for tag, change in changes:
+            with self.subTest(tag=tag):
+                self.cache_with(tag)
+                change()
+                self.assertFalse(self.is_cached())
+
+    def test_edit_keeps_listings_of_other_posts(self):
+        """Правка поста не трогает теги состава списков."""
+        listing_tags = (
+            caching.INDEX,
+            caching.author_tag(self.author.pk),
+            caching.group_tag(self.group.slug),
+        )
+        self.cache_with(*listing_tags)
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = "Изменённый пост"
+        post.save()
+
+        self.assertTrue(self.is_cached())
+
+    def test_moving_post_invalidates_both_groups(self):
+        """Перенос поста в другую группу сбрасывает списки обеих групп."""
+        other = Group.objects.create(
+            title="Другая группа", slug="other_slug", description="-"
+        )
+        self.cache_with(caching.group_tag(self.group.slug))
+        caching.set_tagged("other", "value", [caching.group_tag(other.slug)])
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other
+        post.save()
+
+        self.assertFalse(self.is_cached())
+        self.assertIsNone(caching.get_tagged("other"))
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(POSTS_FEED_ENGINE="merge")
+class TestMergedFeed(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.follower = User.objects.create_user(username="test_dummy_follower")
+        cls.authors = [
+            User.objects.create_user(username=f"test_dummy_author_{num}")
+            for num in range(3)
+        ]
+        for post_num in range(36):
+            Post.objects.create(
+                text=f"Пост {post_num}",
+                author=cls.authors[post_num % 3],
+            )
+        Follow.objects.create(user=cls.follower, author=cls.authors[0])
+        Follow.objects.create(user=cls.follower, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def test_pages_are_merged_newest_first(self):
+        """Лента собирается из постов подписок в порядке публикации."""
+        expected = list(
+            Post.objects.filter(
+                author__in=self.authors[:2]
+            ).order_by("-pub_date", "-pk")
+        )
+
+        for page_num, expected_posts in ((1, expected[:10]),
+                                         (2, expected[10:20])):
+            with self.subTest(page_num=page_num):
+                response = self.follower_client.get(
+                    reverse("posts:follow_index"), {"page": page_num}
+                )
+
+                self.assertEqual(
+                    list(response.context["page"].object_list),
+                    expected_posts,
+                )
+
+    def test_new_post_invalidates_cached_list(self):
+        """Новый пост автора сразу появляется в ленте."""
+        self.follower_client.get(reverse("posts:follow_index"))
+        post = Post.objects.create(text="Свежий пост", author=self.authors[1])
+
+        response = self.follower_client.get(reverse("posts:follow_index"))
+
+        self.assertEqual(response.context["page"].object_list[0], post)
+
+    def test_cursor_pages_follow_merged_order(self):
+        """Переход по курсору продолжает слитую ленту."""
+        expected = list(
+            Post.objects.filter(
+                author__in=self.authors[:2]
+            ).order_by("-pub_date", "-pk")
+        )
+        first = self.follower_client.get(
+            reverse("posts:follow_index")
+        ).context["page"]
+
+        response = self.follower_client.get(
+            reverse("posts:follow_index"), {"cursor": first.next_cursor}
+        )
+
+        self.assertEqual(
+            list(response.context["page"].object_list),
+            expected[10:20],
+        )
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from http import HTTPStatus
@@ -9,6 +10,7 @@ from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Group, Post
+from posts.storage import hashed_name
 
 User = get_user_model()
 
@@ -41,6 +43,9 @@ class TestPostsForms(TestCase):
             b'\x00\x00\x01\x00\x01\x00\x00\x02'
             b'\x02\x4c\x01\x00\x3b'
         )
+        cls.image_name = hashed_name(
+            "posts/small.gif", hashlib.sha256(cls.small_gif).hexdigest()
+        )
 
     @classmethod
     def tearDownClass(cls):
@@ -97,7 +102,7 @@ class TestPostsForms(TestCase):
                 text="Этот пост будет создан через форму "
                      "создания поста",
                 author=self.user,
-                image__icontains="posts/small"
+                image=self.image_name
             ).exists()
         )
 
@@ -140,7 +145,7 @@ class TestPostsForms(TestCase):
                 text=form_data["text"],
                 author=self.user,
                 group=form_data.get("group"),
-                image__icontains="posts/small"
+                image=self.image_name
             ).exists()
         )
 
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+POSTS_TABLES = (
+    "posts_post",
+    "posts_comment",
+    "posts_follow",
+    "posts_timelineentry",
+)
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class TestQueryPlans(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+        cls.follower = User.objects.create_user(username="test_dummy_follower")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Описание группы для теста индексов",
+        )
+        cls.post = Post.objects.create(
+            text="Пост для теста индексов",
+            author=cls.author,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.follower,
+            text="Комментарий",
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def get_plans(self, url):
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are checked on SQLite only")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [
+            (query["sql"], explain(query["sql"]))
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and any(table in query["sql"] for table in POSTS_TABLES)
+        ]
+
+    def test_views_use_expected_indexes(self):
+        """Запросы страниц используют составные индексы."""
+        urls = (
+            (reverse("posts:index"), "post_pub_date_idx"),
+            (
+                reverse("posts:group", args=(self.group.slug,)),
+                "post_group_pub_date_idx",
+            ),
+            (
+                reverse("posts:profile", args=(self.author.username,)),
+                "post_author_pub_date_idx",
+            ),
+            (
+                reverse(
+                    "posts:post", args=(self.author.username, self.post.pk)
+                ),
+                "comment_post_created_idx",
+            ),
+            (reverse("posts:follow_index"), "timeline_user_pub_date_idx"),
+        )
+
+        for url, index in urls:
+            with self.subTest(url=url, index=index):
+                details = " ".join(
+                    " ".join(plan) for _, plan in self.get_plans(url)
+                )
+
+                self.assertIn(f"INDEX {index}", details)
+
+    def test_views_do_not_scan_or_sort_tables(self):
+        """Запросы страниц не читают таблицы целиком и не сортируют их."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group", args=(self.group.slug,)),
+            reverse("posts:profile", args=(self.author.username,)),
+            reverse("posts:post", args=(self.author.username, self.post.pk)),
+            reverse("posts:follow_index"),
+        )
+
+        for url in urls:
+            for sql, plan in self.get_plans(url):
+                for step in plan:
+                    with self.subTest(url=url, sql=sql, step=step):
+                        self.assertFalse(
+                            step.startswith("SCAN") and "INDEX" not in step
+                        )
+                        self.assertNotIn("TEMP B-TREE", step)
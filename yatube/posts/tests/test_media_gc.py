@@ -0,0 +1,95 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import thumbnails
+from posts.models import MediaBlob, Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class TestCollectMediaGarbage(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.kept = self.create_post(SMALL_GIF)
+        self.dropped = self.create_post(SMALL_GIF + b"\0")
+        thumbnails.generate(self.kept.image.name)
+        thumbnails.generate(self.dropped.image.name)
+        self.dropped_name = self.dropped.image.name
+        self.dropped_thumbnails = thumbnails.thumbnail_names(
+            self.dropped_name
+        )
+        self.dropped.delete()
+        self.stray = default_storage.save(
+            "cache/00/00/stray.jpg", ContentFile(b"stray")
+        )
+
+    def create_post(self, content):
+        return Post.objects.create(
+            text="Пост с картинкой",
+            author=self.author,
+            image=SimpleUploadedFile(
+                name="small.gif", content=content, content_type="image/gif"
+            ),
+        )
+
+    def collect(self, **options):
+        stdout = StringIO()
+        call_command(
+            "collect_media_garbage", min_age=0, rate=0, stdout=stdout,
+            **options,
+        )
+        return stdout.getvalue()
+
+    def test_unreferenced_files_are_deleted(self):
+        """Удаляются картинки без постов, их миниатюры и посторонние
+        миниатюры; картинки постов и их миниатюры остаются."""
+        output = self.collect()
+
+        self.assertIn("картинок 1", output)
+        self.assertFalse(default_storage.exists(self.dropped_name))
+        self.assertFalse(default_storage.exists(self.stray))
+        for name in self.dropped_thumbnails:
+            with self.subTest(name=name):
+                self.assertFalse(default_storage.exists(name))
+        self.assertFalse(
+            MediaBlob.objects.filter(name=self.dropped_name).exists()
+        )
+        self.assertTrue(default_storage.exists(self.kept.image.name))
+        self.assertIsNotNone(thumbnails.lookup(self.kept.image, "card"))
+        self.assertTrue(default_storage.exists(
+            thumbnails.lookup(self.kept.image, "card").name
+        ))
+
+    def test_dry_run_deletes_nothing(self):
+        """В пробном режиме команда только сообщает, сколько удалила бы."""
+        output = self.collect(dry_run=True)
+
+        self.assertIn("Было бы удалено: картинок 1", output)
+        self.assertTrue(default_storage.exists(self.dropped_name))
+        self.assertTrue(default_storage.exists(self.stray))
@@ -1,7 +1,12 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Comment, Group, Post
 
 User = get_user_model()
 
@@ -66,3 +71,91 @@ class TestPostModel(TestCase):
                 self.assertEqual(
                     Post._meta.get_field(field).help_text, expected_help_field
                 )
+
+
+class TestPostActivity(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="test_user")
+        cls.post = Post.objects.create(
+            text="Текст тестового поста.",
+            author=cls.user,
+        )
+
+    def test_comments_update_counter_and_activity(self):
+        """Комментарии сдвигают счётчик и время активности поста."""
+        comment = Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text="Комментарий",
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.last_activity, comment.created)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.post.last_activity, self.post.pub_date)
+
+    def test_stale_save_keeps_counters(self):
+        """Сохранение устаревшего экземпляра не затирает счётчики."""
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text="Комментарий",
+        )
+
+        stale.text = "Отредактированный текст"
+        stale.save()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.text, "Отредактированный текст")
+
+    def test_delete_with_stale_counter(self):
+        """Удаление комментария не уводит счётчик ниже нуля."""
+        comment = Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text="Комментарий",
+        )
+        Post.objects.update(comments_count=0)
+
+        comment.delete()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_migration_fills_counters(self):
+        """Миграция заполняет счётчики по уже существующим комментариям."""
+        comment = Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text="Комментарий",
+        )
+        Post.objects.update(
+            comments_count=0, last_activity=self.post.pub_date
+        )
+        migration = import_module("posts.migrations.0009_post_activity")
+
+        migration.fill_activity(apps, None)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.last_activity, comment.created)
+
+    def test_backfill_command_recounts_comments(self):
+        """Команда backfill_post_activity пересчитывает комментарии."""
+        Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text="Комментарий",
+        )
+        Post.objects.update(comments_count=0)
+
+        call_command("backfill_post_activity", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class TestCursorPaginator(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+        for post_num in range(25):
+            Post.objects.create(text=f"Пост {post_num}", author=cls.author)
+        cls.expected = list(Post.objects.order_by("-pub_date", "-pk"))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get_page(self, **params):
+        response = self.guest_client.get(reverse("posts:index"), params)
+        return response.context["page"]
+
+    def test_cursors_walk_through_all_posts(self):
+        """Курсоры ведут по всем постам вперёд и назад без пропусков."""
+        first = self.get_page()
+        second = self.get_page(cursor=first.next_cursor)
+        third = self.get_page(cursor=second.next_cursor)
+        back = self.get_page(cursor=third.previous_cursor)
+
+        self.assertEqual(list(first), self.expected[:10])
+        self.assertEqual(list(second), self.expected[10:20])
+        self.assertEqual(list(third), self.expected[20:])
+        self.assertEqual(third.number, 3)
+        self.assertFalse(third.has_next())
+        self.assertIsNone(third.next_cursor)
+        self.assertEqual(list(back), self.expected[10:20])
+        self.assertEqual(back.number, 2)
+
+    def test_cursor_page_does_not_count_or_offset(self):
+        """Страница по курсору не выполняет COUNT(*) и OFFSET."""
+        cursor = self.get_page().next_cursor
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(cursor=cursor)
+
+        sql = " ".join(query["sql"] for query in queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_cursor_page_without_cached_count(self):
+        """Без закэшированного числа постов COUNT(*) тоже не нужен."""
+        first = self.get_page()
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.get_page(cursor=first.next_cursor)
+
+        sql = " ".join(query["sql"] for query in queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertTrue(second.has_next())
+        self.assertEqual(
+            [link[0] for link in second.paginator.page_links], [1, 2, 3]
+        )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        page = self.get_page(cursor="not-a-cursor")
+
+        self.assertEqual(page.number, 1)
+        self.assertEqual(list(page), self.expected[:10])
+
+    def test_page_links_are_windowed(self):
+        """Виджет страниц выводит окно вокруг текущей страницы."""
+        Post.objects.bulk_create(
+            Post(text=f"Пост {post_num}", author=self.author)
+            for post_num in range(100)
+        )
+        page = self.get_page(page=7)
+
+        self.assertEqual(
+            [link and link[0] for link in page.paginator.page_links],
+            [1, None, 5, 6, 7, 8, 9, None, 13],
+        )
+        self.assertEqual(
+            page.paginator.page_links[3][1],
+            f"cursor={page.previous_cursor}",
+        )
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import stats
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.utils import QueryBoundMixin
+
+User = get_user_model()
+
+
+class TestQueryCounts(QueryBoundMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Описание группы для теста запросов",
+        )
+        cls.reader = User.objects.create_user(username="test_dummy_reader")
+        cls.authors = [
+            User.objects.create_user(username=f"test_dummy_author_{num}")
+            for num in range(5)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for post_num in range(30):
+            Post.objects.create(
+                text=f"Пост {post_num}",
+                author=cls.authors[post_num % 5],
+                group=cls.group,
+            )
+        cls.post = Post.objects.filter(author=cls.authors[0]).first()
+        for comment_num in range(20):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.authors[comment_num % 5],
+                text=f"Комментарий {comment_num}",
+            )
+        stats.recount(User.objects.values_list("pk", flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_views_run_bounded_number_of_queries(self):
+        """Число запросов страницы не зависит от числа постов и
+        комментариев на ней."""
+        author = self.authors[0].username
+        pages = (
+            (reverse("posts:index"), 2),
+            (reverse("posts:group", args=(self.group.slug,)), 3),
+            (reverse("posts:profile", args=(author,)), 3),
+            (reverse("posts:post", args=(author, self.post.pk)), 3),
+        )
+
+        for url, guest_queries in pages:
+            with self.subTest(url=url, client="guest"):
+                with self.assertMaxQueries(guest_queries):
+                    self.guest_client.get(url)
+                # Then the whole page comes from the cache.
+                with self.assertMaxQueries(0):
+                    self.guest_client.get(url)
+            with self.subTest(url=url, client="reader"):
+                # Session and user lookups, plus the follow state on
+                # profiles, come on top for a logged-in reader.
+                with self.assertMaxQueries(guest_queries + 3):
+                    self.reader_client.get(url)
+
+        with self.assertMaxQueries(4):
+            self.reader_client.get(reverse("posts:follow_index"))
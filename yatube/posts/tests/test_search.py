@@ -0,0 +1,147 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search, signals
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class TestSearch(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+        cls.other = User.objects.create_user(username="test_other_author")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test_group", description="Группа"
+        )
+        cls.rare = Post.objects.create(
+            text="Один кот среди длинного рассказа о собаках и погоде",
+            author=cls.author,
+        )
+        cls.frequent = Post.objects.create(
+            text="Кот, кот и ещё раз кот",
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.unrelated = Post.objects.create(
+            text="Про погоду", author=cls.other
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_page(self, **params):
+        response = self.guest_client.get(reverse("posts:search"), params)
+        return response.context["page"]
+
+    def test_index_is_available(self):
+        """Миграции создают индекс FTS5."""
+        self.assertTrue(search.is_available())
+
+    def test_availability_is_checked_once(self):
+        """Наличие индекса проверяется один раз до следующих миграций."""
+        search.forget_availability()
+        with mock.patch.object(
+            connection.introspection, "table_names",
+            wraps=connection.introspection.table_names,
+        ) as table_names:
+            search.is_available()
+            search.is_available()
+            signals.migrated(sender=None)
+            search.is_available()
+
+        self.assertEqual(table_names.call_count, 2)
+
+    def test_ranked_results(self):
+        """Найденные посты упорядочены по релевантности."""
+        self.assertEqual(
+            list(self.get_page(q="КОТ")), [self.frequent, self.rare]
+        )
+
+    def test_prefixes_and_all_words(self):
+        """Слова ищутся как префиксы, и пост должен содержать все."""
+        self.assertEqual(list(self.get_page(q="собак кот")), [self.rare])
+        self.assertEqual(list(self.get_page(q="кот лиса")), [])
+
+    def test_filters(self):
+        """Результаты фильтруются по группе и автору."""
+        by_group = self.get_page(q="кот", group=self.group.slug)
+        by_author = self.get_page(q="погод", author=self.other.username)
+
+        self.assertEqual(list(by_group), [self.frequent])
+        self.assertEqual(list(by_author), [self.unrelated])
+
+    def test_empty_query(self):
+        """Без запроса поиск не выполняется."""
+        response = self.guest_client.get(reverse("posts:search"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context["page"])
+
+    def test_index_follows_edits(self):
+        """Правка и удаление поста сразу видны в поиске."""
+        self.unrelated.text = "Про ёжиков"
+        self.unrelated.save()
+        self.assertEqual(list(self.get_page(q="ёжик")), [self.unrelated])
+        self.assertEqual(list(self.get_page(q="погод")), [self.rare])
+
+        self.unrelated.delete()
+        self.assertEqual(list(self.get_page(q="ёжик")), [])
+
+    def test_cursors_walk_through_all_results(self):
+        """Курсоры ведут по всем результатам вперёд и назад."""
+        for post_num in range(22):
+            Post.objects.create(
+                text=f"Кот номер {post_num}", author=self.other
+            )
+        expected = list(search.search("кот")[0:24])
+
+        first = self.get_page(q="кот")
+        second = self.get_page(q="кот", cursor=first.next_cursor)
+        third = self.get_page(q="кот", cursor=second.next_cursor)
+        back = self.get_page(q="кот", cursor=third.previous_cursor)
+
+        self.assertEqual(list(first) + list(second) + list(third), expected)
+        self.assertEqual(list(back), list(second))
+        self.assertFalse(third.has_next())
+        self.assertEqual(first.paginator.base_query, "q=%D0%BA%D0%BE%D1%82&")
+
+    def test_fallback_without_index(self):
+        """Без FTS5 поиск идёт по вхождению всех слов."""
+        with mock.patch.object(search, "is_available", return_value=False):
+            page = self.get_page(q="кот", group=self.group.slug)
+
+        self.assertEqual(list(page), [self.frequent])
+
+    def test_rebuild(self):
+        """Команда пересобирает индекс, в том числе после update()."""
+        Post.objects.filter(pk=self.unrelated.pk).update(text="Про ежей")
+        out = StringIO()
+
+        call_command("rebuild_search_index", chunk_size=2, stdout=out)
+
+        self.assertIn("Проиндексировано постов: 3", out.getvalue())
+        self.assertEqual(list(self.get_page(q="ежей")), [self.unrelated])
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт по индексу."""
+        admin = User.objects.create_superuser(
+            username="test_admin", password="test_password"
+        )
+        self.guest_client.force_login(admin)
+
+        response = self.guest_client.get(
+            reverse("admin:posts_post_changelist"), {"q": "кот"}
+        )
+
+        self.assertEqual(
+            set(response.context["cl"].result_list),
+            {self.frequent, self.rare},
+        )
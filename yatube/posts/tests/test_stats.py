@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class TestUserStats(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+        cls.follower = User.objects.create_user(username="test_dummy_follower")
+        Post.objects.create(text="Первый пост", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get_profile_context(self):
+        response = self.guest_client.get(
+            reverse("posts:profile", args=(self.author.username,))
+        )
+        return response.context
+
+    def test_profile_creates_exact_stats(self):
+        """Счётчики создаются при первом просмотре профиля."""
+        context = self.get_profile_context()
+
+        self.assertEqual(context["stats"].posts_count, 1)
+        self.assertEqual(context["in_subs"], 0)
+        self.assertEqual(context["subbed_to"], 0)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при подписке, отписке и создании постов."""
+        self.get_profile_context()
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.create(text="Второй пост", author=self.author)
+
+        context = self.get_profile_context()
+        self.assertEqual(context["in_subs"], 1)
+        self.assertEqual(context["stats"].posts_count, 2)
+
+        follow.delete()
+        Post.objects.filter(author=self.author).first().delete()
+
+        context = self.get_profile_context()
+        self.assertEqual(context["in_subs"], 0)
+        self.assertEqual(context["stats"].posts_count, 1)
+
+    def test_delete_with_stale_counter(self):
+        """Отписка и удаление поста не уводят счётчики ниже нуля."""
+        self.get_profile_context()
+        UserStats.objects.get_or_create(user=self.follower)
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        UserStats.objects.update(
+            followers_count=0, following_count=0, posts_count=0
+        )
+
+        follow.delete()
+        Post.objects.filter(author=self.author).delete()
+
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(
+            UserStats.objects.get(user=self.follower).following_count, 0
+        )
+
+    def test_recount_command_repairs_drift(self):
+        """Команда recount_user_stats исправляет разъехавшиеся счётчики."""
+        UserStats.objects.create(
+            user=self.author,
+            followers_count=10,
+            posts_count=10,
+        )
+
+        call_command("recount_user_stats", chunk_size=1, stdout=StringIO())
+
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertTrue(UserStats.objects.filter(user=self.follower).exists())
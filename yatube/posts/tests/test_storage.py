@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import MediaBlob, Post
+from posts.storage import is_content_addressed
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+    POSTS_THUMBNAIL_WORKERS=0,
+)
+class TestContentAddressedStorage(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, name="small.gif", content=SMALL_GIF):
+        return Post.objects.create(
+            text="Пост с картинкой",
+            author=self.author,
+            image=SimpleUploadedFile(
+                name=name, content=content, content_type="image/gif"
+            ),
+        )
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом по хэшу
+        содержимого."""
+        first = self.create_post("first.gif")
+        second = self.create_post("second.GIF")
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_addressed(first.image.name))
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory), [
+            os.path.basename(first.image.name)
+        ])
+
+    def test_concurrent_save_keeps_one_file(self):
+        """Если файл появился между проверкой и записью, копия с
+        суффиксом не создаётся."""
+        storage = Post._meta.get_field("image").storage
+        name = storage.save("posts/first.gif", ContentFile(SMALL_GIF))
+
+        again = storage._save(name, ContentFile(SMALL_GIF))
+
+        self.assertEqual(again, name)
+        directory = os.path.dirname(storage.path(name))
+        self.assertEqual(os.listdir(directory), [os.path.basename(name)])
+
+    def test_refcount_follows_posts(self):
+        """Число ссылок на файл меняется при создании, замене и удалении
+        картинок постов."""
+        first = self.create_post()
+        second = self.create_post()
+        blob = MediaBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(blob.size, len(SMALL_GIF))
+
+        first.delete()
+        second = Post.objects.get(pk=second.pk)
+        second.image = SimpleUploadedFile(
+            name="other.gif", content=SMALL_GIF + b"\0",
+            content_type="image/gif",
+        )
+        second.save()
+
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 0)
+        self.assertIsNotNone(blob.released)
+        self.assertEqual(
+            MediaBlob.objects.get(name=second.image.name).refcount, 1
+        )
+
+    def test_rehome_media_command(self):
+        """Команда rehome_media переносит старые файлы в хранилище по
+        содержимому."""
+        old_name = default_storage.save(
+            "posts/old.gif", ContentFile(SMALL_GIF)
+        )
+        post = Post.objects.create(
+            text="Старый пост", author=self.author, image=old_name
+        )
+
+        call_command("rehome_media", stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertTrue(is_content_addressed(post.image.name))
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertEqual(
+            MediaBlob.objects.get(name=post.image.name).refcount, 1
+        )
@@ -0,0 +1,217 @@
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.management.commands.generate_thumbnails import generate_chunk
+from posts.models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class TestThumbnails(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+        cls.post = Post.objects.create(
+            text="Пост с картинкой",
+            author=cls.author,
+            image=SimpleUploadedFile(
+                name="small.gif", content=SMALL_GIF, content_type="image/gif"
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_placeholder_until_thumbnail_is_generated(self):
+        """Пока миниатюры нет, вместо неё показывается заглушка, а сама
+        страница её не создаёт."""
+        response = self.guest_client.get(reverse("posts:index"))
+
+        self.assertNotContains(response, "<img")
+        self.assertIsNone(thumbnails.lookup(self.post.image, "card"))
+
+    def test_generated_thumbnail_is_shown(self):
+        """Созданная миниатюра появляется на закэшированных страницах."""
+        self.guest_client.get(reverse("posts:index"))
+
+        thumbnails.generate(self.post.image.name)
+
+        response = self.guest_client.get(reverse("posts:index"))
+        thumbnail = thumbnails.lookup(self.post.image, "card")
+        self.assertContains(response, f'src="{thumbnail.url}"')
+
+    def test_generated_variants_are_in_srcset(self):
+        """Варианты в WebP попадают в srcset, а картинка грузится лениво;
+        варианты шире исходной картинки не создаются."""
+        thumbnails.generate(self.post.image.name)
+
+        response = self.guest_client.get(reverse("posts:index"))
+
+        sources = {
+            source["type"]: source["srcset"]
+            for source in response.context["page"][0].image_sources
+        }
+        self.assertRegex(sources["image/webp"], r"^\S+\.webp 480w$")
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_generation_fills_placeholder(self):
+        """Вместе с миниатюрами создаётся заглушка, и карточка выводит её
+        фоном."""
+        thumbnails.generate(self.post.image.name)
+
+        self.post.refresh_from_db()
+        self.assertTrue(
+            self.post.image_placeholder.startswith("data:image/")
+        )
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertContains(response, self.post.image_placeholder)
+
+    def test_backfill_image_placeholders_command(self):
+        """Команда backfill_image_placeholders заполняет пустые
+        заглушки."""
+        call_command(
+            "backfill_image_placeholders", chunk_size=1, stdout=StringIO()
+        )
+
+        self.post.refresh_from_db()
+        self.assertTrue(
+            self.post.image_placeholder.startswith("data:image/")
+        )
+
+    def test_backfill_skips_broken_images(self):
+        """Пропавшая картинка не останавливает создание миниатюр
+        остальных."""
+        count, failed = generate_chunk(
+            ["posts/missing.gif", self.post.image.name]
+        )
+
+        self.assertEqual(count, 2)
+        self.assertEqual([name for name, _ in failed], ["posts/missing.gif"])
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.image_placeholder)
+
+    def test_upload_enqueues_generation(self):
+        """Загрузка картинки ставит создание миниатюр в очередь."""
+        with mock.patch.object(thumbnails, "enqueue") as enqueue:
+            self.author_client.post(
+                reverse("posts:new_post"),
+                data={
+                    "text": "Новый пост",
+                    "image": SimpleUploadedFile(
+                        name="new.gif",
+                        content=SMALL_GIF,
+                        content_type="image/gif",
+                    ),
+                },
+            )
+
+        new_post = Post.objects.get(text="Новый пост")
+        enqueue.assert_called_once_with(new_post.image)
+
+    def test_page_looks_thumbnails_up_in_one_query(self):
+        """Миниатюры всех постов страницы ищутся одним запросом."""
+        for num in range(5):
+            post = Post.objects.create(
+                text=f"Пост {num}",
+                author=self.author,
+                image=SimpleUploadedFile(
+                    name=f"small_{num}.gif",
+                    # Distinct bytes, or the files would be deduplicated.
+                    content=SMALL_GIF + bytes([num]),
+                    content_type="image/gif",
+                ),
+            )
+            thumbnails.generate(post.image.name)
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(reverse("posts:index"))
+
+        kvstore_queries = [
+            query for query in queries
+            if "thumbnail_kvstore" in query["sql"]
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        for post in response.context["page"]:
+            with self.subTest(post=post):
+                if post.pk == self.post.pk:
+                    self.assertIsNone(post.thumbnail)
+                else:
+                    self.assertContains(response, post.thumbnail.url)
+
+
+@override_settings(POSTS_THUMBNAIL_WORKERS=1)
+class TestWorkers(TestCase):
+    def setUp(self):
+        # A fresh pool with POSTS_THUMBNAIL_WORKERS threads.
+        executor = mock.patch.object(thumbnails, "_executor", None)
+        executor.start()
+        self.addCleanup(executor.stop)
+
+    def submit(self, func, *args):
+        # TestCase never commits, so on_commit callbacks run at once.
+        with mock.patch.object(
+            thumbnails.transaction, "on_commit", lambda callback: callback()
+        ):
+            thumbnails.submit(func, *args)
+
+    def test_jobs_run_in_thread_pool(self):
+        """Задания выполняются в пуле потоков."""
+        done = threading.Event()
+        names = []
+
+        def job(value):
+            names.append((threading.current_thread().name, value))
+            done.set()
+
+        self.submit(job, 42)
+
+        self.assertTrue(done.wait(5))
+        self.assertTrue(names[0][0].startswith("thumbnails"))
+        self.assertEqual(names[0][1], 42)
+
+    def test_job_errors_are_logged(self):
+        """Ошибка задания попадает в лог, а не теряется в future."""
+        def job():
+            raise RuntimeError("boom")
+
+        with self.assertLogs("posts.thumbnails", "ERROR") as logs:
+            self.submit(job)
+            # The pool has one thread, so this runs after the failed job.
+            finished = threading.Event()
+            self.submit(finished.set)
+            self.assertTrue(finished.wait(5))
+
+        self.assertIn("boom", "\n".join(logs.output))
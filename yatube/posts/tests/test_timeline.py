@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TestTimeline(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+        cls.follower = User.objects.create_user(username="test_dummy_follower")
+        cls.old_post = Post.objects.create(
+            text="Пост до подписки",
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def timeline_posts(self, user):
+        return set(
+            TimelineEntry.objects.filter(user=user).values_list(
+                "post_id", flat=True
+            )
+        )
+
+    def test_follow_backfills_timeline(self):
+        """При подписке в ленту попадают старые посты автора."""
+        self.follower_client.post(
+            reverse("posts:profile_follow", args=(self.author.username,))
+        )
+
+        self.assertEqual(
+            self.timeline_posts(self.follower),
+            {self.old_post.pk},
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+
+        response = self.follower_client.get(reverse("posts:follow_index"))
+
+        self.assertEqual(
+            list(response.context["page"].object_list),
+            [new_post, self.old_post],
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        """При отписке посты автора убираются из ленты."""
+        Follow.objects.create(user=self.follower, author=self.author)
+
+        self.follower_client.post(
+            reverse("posts:profile_unfollow", args=(self.author.username,))
+        )
+
+        self.assertEqual(self.timeline_posts(self.follower), set())
+
+    def test_unfollow_prunes_timeline_with_other_engine(self):
+        """Отписка чистит ленту и тогда, когда ленты не ведутся."""
+        Follow.objects.create(user=self.follower, author=self.author)
+
+        with override_settings(POSTS_FEED_ENGINE="query"):
+            self.follower_client.post(
+                reverse("posts:profile_unfollow", args=(self.author.username,))
+            )
+
+        self.assertEqual(self.timeline_posts(self.follower), set())
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты по подпискам."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        TimelineEntry.objects.all().delete()
+
+        call_command("rebuild_timelines", chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            self.timeline_posts(self.follower),
+            {self.old_post.pk},
+        )
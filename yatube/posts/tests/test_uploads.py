@@ -0,0 +1,193 @@
+import datetime
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import thumbnails, uploads
+from posts.models import Post, Upload
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+    POSTS_UPLOAD_DIR=tempfile.mkdtemp(dir=settings.BASE_DIR),
+)
+class TestChunkedUploads(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="test_dummy_author")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(settings.POSTS_UPLOAD_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def start(self, content=SMALL_GIF, name="small.gif"):
+        response = self.author_client.post(
+            reverse("posts:start_upload"),
+            HTTP_UPLOAD_NAME=name,
+            HTTP_UPLOAD_LENGTH=str(len(content)),
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def send(self, url, offset, part):
+        return self.author_client.patch(
+            url, part, content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_upload_resumes_from_offset(self):
+        """Загрузка принимает части по порядку, отвергает часть с чужого
+        смещения и сообщает, откуда продолжать."""
+        upload = self.start()
+
+        first = self.send(upload["url"], 0, SMALL_GIF[:10])
+        repeated = self.send(upload["url"], 0, SMALL_GIF[:10])
+        state = self.author_client.get(upload["url"]).json()
+        last = self.send(upload["url"], state["offset"], SMALL_GIF[10:])
+
+        self.assertEqual(first.json()["offset"], 10)
+        self.assertEqual(repeated.status_code, 409)
+        self.assertEqual(state["offset"], 10)
+        self.assertEqual(last.json()["status"], Upload.COMPLETE)
+
+    def test_not_an_image_is_rejected(self):
+        """Файл без заголовка картинки не принимается."""
+        upload = self.start(b"not an image")
+
+        response = self.send(upload["url"], 0, b"not an image")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["status"], Upload.FAILED)
+
+    def create_post(self, upload):
+        """Создаёт пост с загрузкой и обрабатывает её."""
+        with mock.patch.object(thumbnails, "submit") as submit:
+            self.author_client.post(
+                reverse("posts:new_post"),
+                data={"text": "Пост с загрузкой", "upload": upload["token"]},
+            )
+        post = Post.objects.get(text="Пост с загрузкой")
+        self.assertFalse(post.image)
+        func, *args = submit.call_args[0]
+        func(*args)
+        return post
+
+    def test_new_post_takes_completed_upload(self):
+        """Пост получает картинку из загрузки после обработки в фоне."""
+        upload = self.start()
+        self.send(upload["url"], 0, SMALL_GIF)
+
+        post = self.create_post(upload)
+
+        post.refresh_from_db()
+        self.assertTrue(post.image)
+        self.assertEqual(post.image.read(), SMALL_GIF)
+        self.assertEqual(
+            Upload.objects.get(token=upload["token"]).status, Upload.READY
+        )
+
+    def test_extension_follows_format(self):
+        """Расширение файла берётся из формата картинки, а не от
+        клиента."""
+        upload = self.start(name="evil.html")
+        self.send(upload["url"], 0, SMALL_GIF)
+
+        post = self.create_post(upload)
+
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith(".gif"))
+
+    def test_unexpected_error_fails_upload(self):
+        """Неожиданная ошибка обработки переводит загрузку в ошибку."""
+        upload = self.start()
+        self.send(upload["url"], 0, SMALL_GIF)
+
+        with mock.patch.object(
+            uploads.media, "acquire", side_effect=RuntimeError
+        ), self.assertLogs("posts.uploads", "ERROR"):
+            self.create_post(upload)
+
+        upload = Upload.objects.get(token=upload["token"])
+        self.assertEqual(upload.status, Upload.FAILED)
+        self.assertFalse(os.path.exists(uploads.get_path(upload)))
+
+    @override_settings(POSTS_UPLOAD_MAX_OPEN=2)
+    def test_open_uploads_are_limited(self):
+        """Число незавершённых загрузок пользователя ограничено."""
+        self.start()
+        self.start()
+
+        response = self.author_client.post(
+            reverse("posts:start_upload"),
+            HTTP_UPLOAD_NAME="small.gif",
+            HTTP_UPLOAD_LENGTH=str(len(SMALL_GIF)),
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_old_uploads_expire(self):
+        """Старые загрузки удаляются вместе с файлами, а новые и
+        обрабатываемые остаются."""
+        old, processing, fresh = (self.start() for _ in range(3))
+        Upload.objects.filter(token=processing["token"]).update(
+            status=Upload.PROCESSING
+        )
+        Upload.objects.exclude(token=fresh["token"]).update(
+            created=timezone.now() - datetime.timedelta(days=2)
+        )
+        stray = os.path.join(uploads.get_directory(), "stray")
+        open(stray, "wb").close()
+        os.utime(stray, (0, 0))
+
+        output = StringIO()
+        call_command("collect_media_garbage", min_age=0, stdout=output)
+
+        self.assertIn("загрузок 1", output.getvalue())
+        self.assertEqual(
+            set(Upload.objects.values_list("token", flat=True)),
+            {processing["token"], fresh["token"]},
+        )
+        self.assertFalse(os.path.exists(
+            os.path.join(uploads.get_directory(), old["token"])
+        ))
+        self.assertFalse(os.path.exists(stray))
+
+    def test_incomplete_upload_is_not_accepted_by_form(self):
+        """Форма не принимает незавершённую загрузку."""
+        upload = self.start()
+        self.send(upload["url"], 0, SMALL_GIF[:10])
+
+        response = self.author_client.post(
+            reverse("posts:new_post"),
+            data={"text": "Пост с загрузкой", "upload": upload["token"]},
+        )
+
+        self.assertTrue(response.context["form"].errors)
+        self.assertFalse(
+            Post.objects.filter(text="Пост с загрузкой").exists()
+        )
@@ -1,5 +1,7 @@
+import gzip
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -8,6 +10,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts import caching, views
 from posts.forms import PostForm
 from posts.models import Comment, Follow, Group, Post
 
@@ -236,7 +239,10 @@ class TestPostsViews(TestCase):
         for value, expected_value in expected_context.items():
             with self.subTest(value=value, expected_value=expected_value):
                 self.assertEqual(response.context[value], expected_value)
-        self.assertEqual(response.context["post"].image, "posts/small.gif")
+        self.assertRegex(
+            response.context["post"].image.name,
+            r"^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$",
+        )
 
     def test_new_post_page_has_correct_form(self):
         """На страницу выводится правильная форма."""
@@ -268,27 +274,186 @@ class TestPostsViews(TestCase):
                 self.assertEqual(form.initial[value], expected_value)
 
     def test_index_page_caching(self):
-        """Посты на главной странице кэшируются."""
+        """Посты на главной странице кэшируются, пока их не меняют."""
         self.authorized_client.get(reverse("posts:index"))
+        # A queryset update bypasses signals, so the cache is not told.
+        Post.objects.filter(pk=self.marker_post.pk).update(
+            text="Изменено в обход сигналов"
+        )
+
+        response = self.authorized_client.get(reverse("posts:index"))
+
+        self.assertContains(response, self.marker_post.text)
+        self.assertTemplateNotUsed(response, "posts/post_handler.html")
+
+    def test_listing_caches_are_invalidated_by_changes(self):
+        """Новый пост сразу виден на закэшированных страницах."""
+        pages = (
+            reverse("posts:index"),
+            reverse("posts:group", kwargs={"slug": "test_slug"}),
+            reverse(
+                "posts:profile",
+                kwargs={"username": self.author.username}
+            ),
+        )
+        for page in pages:
+            self.authorized_client.get(page)
+
         post = Post.objects.create(
             text="Пост для тестирования кэша",
             author=self.author,
+            group=self.group_with_posts,
         )
 
-        response_1 = self.authorized_client.get(reverse("posts:index"))
-        cache.clear()
-        response_2 = self.authorized_client.get(reverse("posts:index"))
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page)
+
+                self.assertContains(response, post.text)
 
-        self.assertNotContains(
-            response_1,
-            post.text
+    def test_post_edit_invalidates_only_pages_with_it(self):
+        """Правка поста сбрасывает кэш только тех страниц, где он есть."""
+        for num in range(10):
+            Post.objects.create(text=f"Пост {num}", author=self.author)
+        first_page = reverse("posts:index")
+        second_page = first_page + "?page=2"
+        self.authorized_client.get(first_page)
+        self.authorized_client.get(second_page)
+
+        self.authorized_client.post(
+            reverse(
+                "posts:edit_post",
+                kwargs={
+                    "username": self.author.username,
+                    "post_id": self.marker_post.pk,
+                },
+            ),
+            data={
+                "text": "Изменённый пост",
+                "group": self.group_with_posts.pk,
+            },
         )
-        self.assertTemplateNotUsed(response_1, "posts/post_handler.html")
-        self.assertContains(
-            response_2,
-            post.text
+
+        first_response = self.authorized_client.get(first_page)
+        second_response = self.authorized_client.get(second_page)
+        self.assertTemplateNotUsed(first_response, "posts/post_handler.html")
+        self.assertContains(second_response, "Изменённый пост")
+
+    def test_shared_listing_cache_keeps_personal_parts(self):
+        """Закэшированный список общий, а кнопка редактирования и меню
+        дорисовываются для каждого пользователя."""
+        edit_url = reverse(
+            "posts:edit_post",
+            kwargs={
+                "username": self.author.username,
+                "post_id": self.marker_post.pk,
+            },
         )
-        self.assertTemplateUsed(response_2, "posts/post_handler.html")
+        reader = User.objects.create_user(username="test_dummy_reader")
+        reader_client = Client()
+        reader_client.force_login(reader)
+
+        author_response = self.authorized_client.get(reverse("posts:index"))
+        reader_response = reader_client.get(reverse("posts:index"))
+        guest_response = Client().get(reverse("posts:index"))
+
+        self.assertContains(author_response, edit_url)
+        self.assertContains(author_response, self.author.username)
+        self.assertNotContains(reader_response, edit_url)
+        self.assertContains(reader_response, reader.username)
+        self.assertTemplateNotUsed(reader_response, "posts/post_handler.html")
+        self.assertNotContains(guest_response, edit_url)
+        self.assertNotContains(guest_response, "<!--hole:")
+
+    def test_anonymous_pages_are_cached_whole(self):
+        """Анонимным читателям страница отдаётся из кэша без рендеринга."""
+        guest_client = Client()
+        guest_client.get(reverse("posts:index"))
+        Post.objects.filter(pk=self.marker_post.pk).update(
+            text="Изменено в обход сигналов"
+        )
+
+        response = guest_client.get(reverse("posts:index"))
+
+        self.assertContains(response, self.marker_post.text)
+        self.assertEqual(response.templates, [])
+        self.assertContains(response, reverse("login"))
+
+    def test_page_invalidated_while_rendering_is_not_cached(self):
+        """Страница, сброшенная во время рендеринга, не кэшируется."""
+        guest_client = Client()
+        render = views.render
+
+        def render_and_invalidate(*args, **kwargs):
+            caching.invalidate_tags(caching.INDEX)
+            return render(*args, **kwargs)
+
+        with mock.patch.object(views, "render", render_and_invalidate):
+            guest_client.get(reverse("posts:index"))
+        response = guest_client.get(reverse("posts:index"))
+
+        self.assertNotEqual(response.templates, [])
+
+    def test_conditional_get_returns_not_modified(self):
+        """По ETag и Last-Modified отдаётся 304, пока пост не изменился."""
+        guest_client = Client()
+        page = reverse(
+            "posts:post",
+            kwargs={
+                "username": self.author.username,
+                "post_id": self.marker_post.pk,
+            },
+        )
+        response = guest_client.get(page)
+        validators = (
+            {"HTTP_IF_NONE_MATCH": response["ETag"]},
+            {"HTTP_IF_MODIFIED_SINCE": response["Last-Modified"]},
+        )
+
+        for headers in validators:
+            with self.subTest(headers=headers):
+                self.assertEqual(
+                    guest_client.get(page, **headers).status_code, 304
+                )
+
+        Comment.objects.create(
+            post=self.marker_post, author=self.author, text="Новый"
+        )
+        response = guest_client.get(page, **validators[0])
+
+        self.assertContains(response, "Новый")
+
+    def test_cached_page_is_served_compressed(self):
+        """Закэшированная страница хранится и отдаётся сжатой gzip."""
+        guest_client = Client()
+        guest_client.get(reverse("posts:index"))
+
+        response = guest_client.get(
+            reverse("posts:index"), HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn(
+            self.marker_post.text.encode(), gzip.decompress(response.content)
+        )
+
+    def test_anonymous_page_cache_is_invalidated(self):
+        """Изменение группы или профиля сбрасывает кэш их страниц."""
+        guest_client = Client()
+        group_page = reverse("posts:group", kwargs={"slug": "test_slug"})
+        profile_page = reverse(
+            "posts:profile", kwargs={"username": self.author.username}
+        )
+        guest_client.get(group_page)
+        guest_client.get(profile_page)
+
+        self.group_with_posts.title = "Новое название группы"
+        self.group_with_posts.save()
+        self.author.first_name = "Новое имя"
+        self.author.save()
+
+        self.assertContains(guest_client.get(group_page), "Новое название")
+        self.assertContains(guest_client.get(profile_page), "Новое имя")
 
     def test_posts_exist_on_expected_pages(self):
         """Посты появляются там, где должны."""
@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBoundMixin:
+    """Проверка верхней границы числа SQL-запросов для TestCase."""
+
+    @contextmanager
+    def assertMaxQueries(self, maximum, using="default"):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context)
+        if executed > maximum:
+            queries = "\n".join(
+                f"{num}. {query['sql']}"
+                for num, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f"{executed} queries executed, at most {maximum} "
+                f"expected:\n{queries}"
+            )
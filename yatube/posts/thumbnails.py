@@ -0,0 +1,277 @@
+"""
+Миниатюры картинок постов создаются заранее, а не при первом показе.
+
+После сохранения поста с картинкой enqueue() ставит создание миниатюр
+всех размеров из POSTS_THUMBNAILS в пул потоков. Представления перед
+рендерингом одним запросом к хранилищу sorl находят готовые миниатюры
+всех постов страницы (см. attach); пока миниатюры нет, шаблон
+показывает заглушку.
+
+Кроме основной миниатюры для каждого размера создаются варианты ширин
+POSTS_THUMBNAIL_WIDTHS в современных форматах POSTS_THUMBNAIL_FORMATS
+(из тех, что умеют сохранять Pillow и sorl), и шаблон отдаёт их через
+srcset, чтобы браузер сам выбирал подходящий файл.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from . import caching, placeholders
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS = {
+    "card": ("960x339", {"crop": "center", "upscale": True}),
+}
+WIDTHS = (480, 960, 1440)
+FORMATS = ("AVIF", "WEBP")
+WORKERS = 2
+
+_executor = None
+
+
+def get_sizes():
+    """Размеры миниатюр: имя -> (геометрия, параметры sorl)."""
+    return getattr(settings, "POSTS_THUMBNAILS", THUMBNAILS)
+
+
+def get_widths():
+    """Ширины вариантов миниатюр в пикселях."""
+    return getattr(settings, "POSTS_THUMBNAIL_WIDTHS", WIDTHS)
+
+
+def get_formats():
+    """Форматы вариантов, которые можно сохранить в этом окружении."""
+    Image.init()
+    return [
+        format_
+        for format_ in getattr(settings, "POSTS_THUMBNAIL_FORMATS", FORMATS)
+        if format_ in EXTENSIONS and format_ in Image.SAVE
+    ]
+
+
+def get_variants(size):
+    """
+    Варианты миниатюры size: (формат, ширина) -> (геометрия, параметры).
+    Пропорции у всех вариантов те же, что у самой миниатюры.
+    """
+    geometry, options = get_sizes()[size]
+    width, height = map(int, geometry.split("x"))
+    variants = {}
+    for format_ in get_formats():
+        for variant_width in get_widths():
+            variant_height = round(variant_width * height / width)
+            variants[format_, variant_width] = (
+                f"{variant_width}x{variant_height}",
+                dict(options, format=format_),
+            )
+    return variants
+
+
+class LookupBackend(ThumbnailBackend):
+    """Находит уже созданные миниатюры, не создавая новых."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, под которым её сохранил бы get_thumbnail()."""
+        source = ImageFile(file_)
+        # The same option defaults as in get_thumbnail(), so the name
+        # matches the one the thumbnail was stored under.
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(thumbnail_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = LookupBackend()
+
+
+def _get_raw_many(keys):
+    """Значения хранилища sorl по ключам keys, как _get_raw(), но разом."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        values = {key: kvstore._get_raw(key) for key in keys}
+        return {key: value for key, value in values.items() if value}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                "key", "value"
+            )
+        )
+        loaded = {
+            key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+            for key in missing
+        }
+        # Misses are remembered too, as sorl itself does.
+        kvstore.cache.set_many(
+            loaded, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(loaded)
+    return {
+        key: value for key, value in values.items()
+        if value and value is not cached_db_kvstore.EMPTY_VALUE
+    }
+
+
+def _find(images, specs):
+    """
+    Готовые миниатюры картинок images по спецификациям specs
+    (метка -> (геометрия, параметры)): (имя, метка) -> файл.
+    Все ключи читаются одним обращением к хранилищу sorl.
+    """
+    keys = {}
+    names = set()
+    for image in images:
+        if not image or image.name in names:
+            continue
+        names.add(image.name)
+        for label, (geometry, options) in specs.items():
+            thumbnail = backend.thumbnail_file(image, geometry, **options)
+            keys[add_prefix(thumbnail.key)] = (image.name, label)
+    values = _get_raw_many(list(keys))
+    return {
+        keys[key]: deserialize_image_file(value)
+        for key, value in values.items()
+    }
+
+
+def lookup_many(images, size):
+    """Готовые миниатюры картинок images размера size: имя -> файл."""
+    found = _find(images, {size: get_sizes()[size]})
+    return {name: thumbnail for (name, _), thumbnail in found.items()}
+
+
+def attach(posts, size="card"):
+    """
+    Кладёт в post.thumbnail готовую миниатюру или None, а в
+    post.image_sources — список {"type", "srcset"} готовых вариантов.
+    """
+    posts = list(posts)
+    variants = get_variants(size)
+    found = _find(
+        (post.image for post in posts),
+        {size: get_sizes()[size], **variants},
+    )
+    for post in posts:
+        name = post.image.name if post.image else None
+        post.thumbnail = found.get((name, size))
+        post.image_sources = []
+        if post.thumbnail is None:
+            continue
+        for format_ in get_formats():
+            candidates = [
+                found[name, label] for label in variants
+                if label[0] == format_ and (name, label) in found
+            ]
+            if candidates:
+                post.image_sources.append({
+                    "type": f"image/{format_.lower()}",
+                    "srcset": ", ".join(
+                        f"{file_.url} {file_.width}w"
+                        for file_ in candidates
+                    ),
+                })
+    return posts
+
+
+def thumbnail_names(name):
+    """Имена всех миниатюр и вариантов картинки name во всех размерах."""
+    source = ImageFile(name, Post._meta.get_field("image").storage)
+    names = []
+    for size, spec in get_sizes().items():
+        for geometry, options in (spec, *get_variants(size).values()):
+            thumbnail = backend.thumbnail_file(source, geometry, **options)
+            names.append(thumbnail.name)
+    return names
+
+
+def lookup(image, size):
+    """Готовая миниатюра картинки image размера size или None."""
+    if not image:
+        return None
+    return lookup_many([image], size).get(image.name)
+
+
+def generate(name):
+    """
+    Создаёт заглушку и миниатюры всех размеров для картинки с именем
+    name.
+    """
+    placeholders.fill(name)
+    image = ImageFile(name, Post._meta.get_field("image").storage)
+    source_width, _ = default.engine.get_image_size(
+        default.engine.get_image(image)
+    )
+    # Upscaled variants only cost bytes; the narrowest one is always
+    # made so that every format has a candidate.
+    widths = {
+        width for width in get_widths()
+        if width <= source_width or width == min(get_widths())
+    }
+    for size, (geometry, options) in get_sizes().items():
+        get_thumbnail(image, geometry, **options)
+        for (_, width), variant in get_variants(size).items():
+            if width in widths:
+                get_thumbnail(image, variant[0], **variant[1])
+    # Cached pages still show the placeholder.
+    post_ids = Post.objects.filter(image=name).values_list("pk", flat=True)
+    caching.invalidate_tags(*map(caching.post_tag, post_ids))
+
+
+def _run_in_thread(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        # Nobody waits for the future, so the error would be lost.
+        logger.exception("Image job %s%r failed", func.__name__, args)
+    finally:
+        # Worker threads open their own connections.
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "POSTS_THUMBNAIL_WORKERS", WORKERS),
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def submit(func, *args):
+    """
+    Выполняет func(*args) в пуле потоков обработки картинок после
+    коммита текущей транзакции.
+    """
+    if not getattr(settings, "POSTS_THUMBNAIL_WORKERS", WORKERS):
+        transaction.on_commit(lambda: func(*args))
+        return
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run_in_thread, func, *args)
+    )
+
+
+def enqueue(image):
+    """Ставит создание миниатюр image в очередь после коммита."""
+    if image:
+        submit(generate, image.name)
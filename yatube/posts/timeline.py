@@ -0,0 +1,89 @@
+"""
+Материализованные ленты подписок (fan-out-on-write).
+
+Каждый новый пост сразу раскладывается в ленты подписчиков автора,
+поэтому чтение ленты — это один проход по индексу (user, pub_date).
+"""
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _insert(entries, batch_size=BATCH_SIZE):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post, batch_size=BATCH_SIZE):
+    """Добавляет пост в ленты всех подписчиков его автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list("user_id", flat=True)
+    _insert(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size,
+    )
+
+
+def backfill(user_id, author_id, batch_size=BATCH_SIZE):
+    """Добавляет в ленту пользователя все посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by().values_list("pk", "pub_date")
+    _insert(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts.iterator()
+        ),
+        batch_size,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты пользователя посты автора."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+
+
+def rebuild(user_ids=None, chunk_size=BATCH_SIZE):
+    """
+    Пересобирает ленты по существующим подпискам.
+
+    Подписки обходятся порциями по первичному ключу, каждая порция
+    в отдельной транзакции. Возвращает число обработанных подписок.
+    """
+    follows = Follow.objects.order_by("pk")
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+
+    processed = 0
+    last_pk = 0
+    while True:
+        chunk = list(
+            follows.filter(pk__gt=last_pk).values_list(
+                "pk", "user_id", "author_id"
+            )[:chunk_size]
+        )
+        if not chunk:
+            return processed
+        with transaction.atomic():
+            for _, user_id, author_id in chunk:
+                backfill(user_id, author_id, chunk_size)
+        processed += len(chunk)
+        last_pk = chunk[-1][0]
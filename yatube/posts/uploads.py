@@ -0,0 +1,282 @@
+"""
+Загрузка картинок постов по частям с докачкой.
+
+Клиент создаёт загрузку (start), затем отправляет файл кусками
+(append), каждый раз указывая смещение. После обрыва связи смещение, с
+которого нужно продолжить, берётся из Upload.received. Куски пишутся
+во временный файл в POSTS_UPLOAD_DIR по мере чтения тела запроса и
+целиком в памяти не держатся.
+
+Когда файл получен полностью, проверяется только заголовок картинки:
+формат и размеры. Форма поста принимает ссылку на завершённую загрузку,
+а полное декодирование, перенос в хранилище и миниатюры выполняются в
+пуле потоков после сохранения поста (см. attach и process).
+
+У пользователя не больше POSTS_UPLOAD_MAX_OPEN незавершённых загрузок.
+Загрузки старше POSTS_UPLOAD_MAX_AGE секунд вместе с файлами удаляет
+expire (её вызывает `manage.py collect_media_garbage`).
+"""
+import datetime
+import logging
+import os
+import secrets
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+from PIL import Image
+
+from . import caching, media, thumbnails
+from .models import Post, Upload
+
+CHUNK_SIZE = 256 * 1024
+MAX_SIZE = 20 * 1024 * 1024
+MAX_OPEN = 10
+MAX_AGE = 24 * 60 * 60
+# Supported formats and the extensions their files are stored with.
+FORMATS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    """Загрузку нельзя продолжить; текст ошибки можно показать клиенту."""
+
+
+class OffsetMismatch(UploadError):
+    """Кусок прислан не с того смещения, на котором стоит загрузка."""
+
+
+def get_directory():
+    return getattr(
+        settings, "POSTS_UPLOAD_DIR",
+        os.path.join(tempfile.gettempdir(), "yatube-uploads"),
+    )
+
+
+def get_max_size():
+    return getattr(settings, "POSTS_UPLOAD_MAX_SIZE", MAX_SIZE)
+
+
+def get_max_open():
+    return getattr(settings, "POSTS_UPLOAD_MAX_OPEN", MAX_OPEN)
+
+
+def get_max_age():
+    return getattr(settings, "POSTS_UPLOAD_MAX_AGE", MAX_AGE)
+
+
+def get_path(upload):
+    return os.path.join(get_directory(), upload.token)
+
+
+def start(user, filename, size):
+    """Создаёт загрузку файла filename размером size байт."""
+    if not filename:
+        raise UploadError("Не указано имя файла")
+    if not 0 < size <= get_max_size():
+        raise UploadError(
+            f"Размер файла должен быть от 1 до {get_max_size()} байт"
+        )
+    open_uploads = Upload.objects.filter(
+        user=user, status__in=(Upload.PENDING, Upload.COMPLETE)
+    )
+    if open_uploads.count() >= get_max_open():
+        raise UploadError("Слишком много незавершённых загрузок")
+    upload = Upload.objects.create(
+        token=secrets.token_urlsafe(24),
+        user=user,
+        filename=os.path.basename(filename)[:255],
+        size=size,
+    )
+    os.makedirs(get_directory(), exist_ok=True)
+    open(get_path(upload), "wb").close()
+    return upload
+
+
+def check_header(path):
+    """
+    Проверяет формат и размеры картинки, не декодируя её. Возвращает
+    формат.
+    """
+    try:
+        # Image.open() reads only the header.
+        with Image.open(path) as image:
+            format_, (width, height) = image.format, image.size
+    except (OSError, Image.DecompressionBombError):
+        raise UploadError("Файл не является картинкой")
+    if format_ not in FORMATS:
+        raise UploadError(f"Формат {format_} не поддерживается")
+    if Image.MAX_IMAGE_PIXELS and width * height > Image.MAX_IMAGE_PIXELS:
+        raise UploadError("Слишком большая картинка")
+    return format_
+
+
+def get_filename(filename, format_):
+    """
+    Имя файла filename с расширением формата format_: расширение от
+    клиента могло бы заставить браузер открыть файл как HTML.
+    """
+    return os.path.splitext(filename)[0] + FORMATS[format_]
+
+
+def append(upload, offset, stream):
+    """
+    Дописывает в загрузку upload содержимое stream, начиная с offset.
+    Возвращает обновлённую загрузку.
+    """
+    if upload.status != Upload.PENDING:
+        raise UploadError("Загрузка уже завершена")
+    if offset != upload.received:
+        raise OffsetMismatch("Неверное смещение")
+    received = offset
+    with open(get_path(upload), "r+b") as file_:
+        # Drops the tail of a part that was cut off mid-way.
+        file_.truncate(offset)
+        file_.seek(offset)
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > upload.size:
+                raise UploadError("Получено больше заявленного размера")
+            file_.write(chunk)
+    # Of two clients sending the same part only one moves the offset.
+    moved = Upload.objects.filter(pk=upload.pk, received=offset).update(
+        received=received
+    )
+    if not moved:
+        raise OffsetMismatch("Неверное смещение")
+    upload.received = received
+    if received == upload.size:
+        try:
+            check_header(get_path(upload))
+        except UploadError as error:
+            fail(upload, str(error))
+            raise
+        upload.status = Upload.COMPLETE
+        upload.save(update_fields=("status",))
+    return upload
+
+
+def fail(upload, error):
+    upload.status = Upload.FAILED
+    upload.error = error[:255]
+    upload.save(update_fields=("status", "error"))
+    _remove(upload)
+
+
+def _remove(upload):
+    try:
+        os.remove(get_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def attach(upload, post):
+    """Ставит перенос загрузки upload в картинку поста post в очередь."""
+    upload.post = post
+    upload.status = Upload.PROCESSING
+    upload.save(update_fields=("post", "status"))
+    thumbnails.submit(process, upload.pk)
+
+
+def process(upload_pk):
+    """Декодирует загруженную картинку и делает её картинкой поста."""
+    upload = Upload.objects.select_related("post").get(pk=upload_pk)
+    try:
+        name = _move_to_post(upload)
+    except Exception:
+        # Otherwise the upload would stay in PROCESSING for good.
+        logger.exception("Upload %s failed", upload.pk)
+        fail(upload, "Не удалось обработать картинку")
+        return
+    if name is not None:
+        thumbnails.generate(name)
+
+
+def _move_to_post(upload):
+    """
+    Переносит картинку загрузки upload в хранилище и в её пост.
+    Возвращает имя картинки или None, если загрузка не удалась.
+    """
+    post = upload.post
+    if post is None:
+        fail(upload, "Пост удалён")
+        return None
+    path = get_path(upload)
+    try:
+        format_ = check_header(path)
+        with Image.open(path) as image:
+            image.load()
+    except (OSError, Image.DecompressionBombError, UploadError):
+        fail(upload, "Картинка повреждена")
+        return None
+    field = Post._meta.get_field("image")
+    filename = get_filename(upload.filename, format_)
+    with open(path, "rb") as file_:
+        name = field.storage.save(
+            field.generate_filename(post, filename), File(file_)
+        )
+    old_name = Post.objects.filter(pk=post.pk).values_list(
+        "image", flat=True
+    ).first()
+    # Signals are bypassed, so the references are moved here.
+    Post.objects.filter(pk=post.pk).update(image=name, image_placeholder="")
+    media.acquire(name)
+    if old_name and old_name != name:
+        media.release(old_name)
+    upload.status = Upload.READY
+    upload.save(update_fields=("status",))
+    _remove(upload)
+    caching.invalidate_tags(caching.post_tag(post.pk))
+    return name
+
+
+def expire(max_age=None, dry_run=False):
+    """
+    Удаляет загрузки старше max_age секунд (по умолчанию
+    POSTS_UPLOAD_MAX_AGE), кроме обрабатываемых, и файлы в
+    POSTS_UPLOAD_DIR, у которых загрузки уже нет. Возвращает число
+    удалённых загрузок.
+    """
+    if max_age is None:
+        max_age = get_max_age()
+    stale = Upload.objects.filter(
+        created__lt=timezone.now() - datetime.timedelta(seconds=max_age)
+    ).exclude(status=Upload.PROCESSING)
+    if dry_run:
+        return stale.count()
+    count = 0
+    for upload in stale.iterator():
+        # attach() may have taken the upload since the query.
+        deleted, _ = Upload.objects.filter(pk=upload.pk).exclude(
+            status=Upload.PROCESSING
+        ).delete()
+        if deleted:
+            _remove(upload)
+            count += 1
+    _remove_orphans(time.time() - max_age)
+    return count
+
+
+def _remove_orphans(cutoff):
+    """Файлы загрузок, удалённых вместе с пользователями."""
+    tokens = set(Upload.objects.values_list("token", flat=True))
+    try:
+        entries = list(os.scandir(get_directory()))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if (
+            entry.name not in tokens
+            and entry.is_file(follow_symlinks=False)
+            and entry.stat(follow_symlinks=False).st_mtime < cutoff
+        ):
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -25,6 +25,21 @@ urlpatterns = [
         views.follow_index,
         name="follow_index"
     ),
+    path(
+        "search/",
+        views.search_posts,
+        name="search"
+    ),
+    path(
+        "uploads/",
+        views.start_upload,
+        name="start_upload"
+    ),
+    path(
+        "uploads/<str:token>/",
+        views.upload_detail,
+        name="upload_detail"
+    ),
     path(
         "<str:username>/",
         views.profile,
@@ -1,68 +1,184 @@
+from urllib.parse import unquote
+
 import django.views.decorators.http as http_dec
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 
-from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from . import caching, feeds, search, stats, thumbnails, uploads
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Comment, Follow, Group, Post, Upload, User
+from .paginator import paginate
 
 
 @http_dec.require_GET
+@caching.cache_anonymous_page
 def index(request):
-    posts = Post.objects.select_related("author")
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    posts = Post.objects.select_related("author", "group")
+    page = paginate(request, posts)
+    thumbnails.attach(page)
+    tags = caching.listing_tags(page, caching.INDEX)
     context = {
         "page": page,
-        "page_number": page_number
+        "page_number": request.GET.get("page"),
+        "cursor": request.GET.get("cursor"),
+        **caching.listing_context(tags),
     }
-    return render(request, "posts/index.html", context)
+    response = render(request, "posts/index.html", context)
+    return caching.tag_response(response, tags)
 
 
 @http_dec.require_GET
 @login_required
 def follow_index(request):
-    user = request.user
-    authors = Follow.objects.filter(user=user).values_list("author")
-    posts = Post.objects.filter(author__in=authors)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    posts = feeds.follow_feed(request.user)
+    page = paginate(request, posts, keys=feeds.FEED_KEYS)
+    thumbnails.attach(page)
     context = {
         "page": page,
-        "page_number": page_number
+        "page_number": request.GET.get("page"),
+        "cursor": request.GET.get("cursor"),
     }
     return render(request, "posts/follow.html", context)
 
 
 @http_dec.require_GET
+@caching.cache_anonymous_page
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related("author")
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    posts = group.posts.select_related("author", "group")
+    page = paginate(request, posts)
+    thumbnails.attach(page)
+    tags = caching.listing_tags(page, caching.group_tag(group.slug))
     context = {
         "group": group,
         "page": page,
+        "page_number": request.GET.get("page"),
+        "cursor": request.GET.get("cursor"),
+        **caching.listing_context(tags),
+    }
+
+    response = render(request, "posts/group.html", context)
+    return caching.tag_response(response, tags)
+
+
+@http_dec.require_GET
+def search_posts(request):
+    form = SearchForm(request.GET)
+    page = None
+    if form.is_valid() and form.cleaned_data["q"]:
+        posts = search.search(
+            form.cleaned_data["q"],
+            group=form.cleaned_data["group"],
+            author=form.cleaned_data["author"],
+        )
+        page = paginate(request, posts, keys=search.SEARCH_KEYS)
+        thumbnails.attach(page)
+    context = {
+        "form": form,
+        "page": page,
     }
+    return render(request, "posts/search.html", context)
+
+
+def _get_upload(request):
+    """Завершённая загрузка по частям из поля upload формы поста."""
+    token = request.POST.get("upload")
+    if not token:
+        return None
+    return get_object_or_404(
+        Upload, token=token, user=request.user, post__isnull=True
+    )
 
-    return render(request, "posts/group.html", context)
+
+def _upload_response(upload, status=200, error=""):
+    url = reverse("posts:upload_detail", args=(upload.token,))
+    response = JsonResponse(
+        {
+            "token": upload.token,
+            "url": url,
+            "offset": upload.received,
+            "size": upload.size,
+            "status": upload.status,
+            "error": error or upload.error,
+        },
+        status=status,
+    )
+    response["Upload-Offset"] = upload.received
+    response["Cache-Control"] = "no-store"
+    if status == 201:
+        response["Location"] = url
+    return response
+
+
+@http_dec.require_POST
+@login_required
+def start_upload(request):
+    """
+    Начинает загрузку по частям. Имя (в кодировке URL) и размер файла
+    передаются в заголовках Upload-Name и Upload-Length.
+    """
+    try:
+        size = int(request.headers.get("Upload-Length", ""))
+    except ValueError:
+        return JsonResponse({"error": "Не указан размер файла"}, status=400)
+    try:
+        upload = uploads.start(
+            request.user,
+            unquote(request.headers.get("Upload-Name", "")),
+            size,
+        )
+    except uploads.UploadError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    return _upload_response(upload, status=201)
+
+
+@http_dec.require_http_methods(["GET", "HEAD", "PATCH"])
+@login_required
+def upload_detail(request, token):
+    """
+    Состояние загрузки по частям (GET, HEAD) и приём очередной части
+    (PATCH с заголовком Upload-Offset и телом-куском файла).
+    """
+    upload = get_object_or_404(Upload, token=token, user=request.user)
+    if request.method != "PATCH":
+        return _upload_response(upload)
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        return JsonResponse({"error": "Не указано смещение"}, status=400)
+    try:
+        # The body is read from the request stream part by part.
+        uploads.append(upload, offset, request)
+    except uploads.OffsetMismatch:
+        upload.refresh_from_db()
+        return _upload_response(upload, status=409)
+    except uploads.UploadError as error:
+        upload.refresh_from_db()
+        return _upload_response(upload, status=400, error=str(error))
+    return _upload_response(upload)
 
 
 @http_dec.require_http_methods(["GET", "POST"])
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None
+        files=request.FILES or None,
+        upload=_get_upload(request),
     )
 
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if form.upload is not None:
+            uploads.attach(form.upload, post)
+        else:
+            thumbnails.enqueue(post.image)
         return redirect("posts:index")
 
     context = {
@@ -82,11 +198,19 @@ def edit_post(request, username, post_id):
     form = PostForm(
         request.POST or None,
         instance=post,
-        files=request.FILES or None
+        files=request.FILES or None,
+        upload=_get_upload(request),
     )
 
     if form.is_valid():
+        if "image" in form.changed_data:
+            # The new placeholder is made with the thumbnails.
+            post.image_placeholder = ""
         form.save()
+        if form.upload is not None:
+            uploads.attach(form.upload, post)
+        elif "image" in form.changed_data:
+            thumbnails.enqueue(post.image)
         return redirect("posts:post", username, post_id)
 
     context = {
@@ -98,36 +222,53 @@ def edit_post(request, username, post_id):
 
 
 @http_dec.require_GET
+@caching.cache_anonymous_page
 def profile(request, username):
-    profile_data = get_object_or_404(User, username=username)
+    profile_data = get_object_or_404(
+        User.objects.select_related("stats"),
+        username=username
+    )
     following = Follow.objects.filter(
         user=request.user,
         author=profile_data
     ).exists() if request.user.is_authenticated else False
 
-    subbed_to = Follow.objects.filter(user=profile_data).count()
-    in_subs = Follow.objects.filter(author=profile_data).count()
+    profile_stats = stats.get_stats(profile_data)
 
-    posts = profile_data.posts.select_related("author")
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    posts = profile_data.posts.select_related("author", "group")
+    page = paginate(request, posts)
+    thumbnails.attach(page)
+    tags = caching.listing_tags(page, caching.author_tag(profile_data.pk))
 
     context = {
         "profile_data": profile_data,
         "page": page,
         "following": following,
-        "subbed_to": subbed_to,
-        "in_subs": in_subs,
+        "stats": profile_stats,
+        "subbed_to": profile_stats.following_count,
+        "in_subs": profile_stats.followers_count,
+        "page_number": request.GET.get("page"),
+        "cursor": request.GET.get("cursor"),
+        **caching.listing_context(tags),
     }
-    return render(request, "posts/profile.html", context)
+    response = render(request, "posts/profile.html", context)
+    return caching.tag_response(
+        response, [*tags, caching.user_tag(profile_data.pk)]
+    )
 
 
 @http_dec.require_GET
+@caching.cache_anonymous_page
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related("author", "group"),
+        pk=post_id
+    )
+    thumbnails.attach([post])
     author_data = get_object_or_404(User, username=username)
-    comments = Comment.objects.filter(post=post)
+    comments = Comment.objects.filter(post=post).select_related(
+        "author"
+    ).order_by("created")
     form = CommentForm()
 
     context = {
@@ -136,11 +277,16 @@ def post_view(request, username, post_id):
         "comments": comments,
         "form": form
     }
-    return render(request, "posts/post.html", context)
+    tags = [caching.post_tag(post.pk), caching.user_tag(post.author_id)]
+    if post.group is not None:
+        tags.append(caching.group_tag(post.group.slug))
+    response = render(request, "posts/post.html", context)
+    return caching.tag_response(response, tags)
 
 
 @http_dec.require_POST
 @login_required
+@transaction.atomic
 def add_comment(request, post_id, username):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -168,6 +314,7 @@ def add_comment(request, post_id, username):
 @http_dec.require_http_methods(["GET", "POST"])  # Pytest tests use GET
 # instead of POST, so GET is required here
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
@@ -181,6 +328,7 @@ def profile_follow(request, username):
 
 @http_dec.require_http_methods(["GET", "POST"])  # Same as def profile_follow
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
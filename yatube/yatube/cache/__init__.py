@@ -0,0 +1,3 @@
+from .swr import StaleWhileRevalidateCache  # noqa: F401
+from .sqlite import SQLiteCache  # noqa: F401
+from .tiered import TieredCache  # noqa: F401
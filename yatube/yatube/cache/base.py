@@ -0,0 +1,72 @@
+"""Общие части обёрток над бэкендами кэша."""
+import threading
+import time
+
+from django.utils.module_loading import import_string
+
+FLUSH_INTERVAL = 10
+
+
+def create_cache(config):
+    """Создаёт бэкенд по словарю в формате настройки CACHES."""
+    params = dict(config)
+    backend = import_string(params.pop("BACKEND"))
+    return backend(params.pop("LOCATION", ""), params)
+
+
+class Counters:
+    """
+    Счётчики событий кэша. Считаются в памяти процесса и раз в
+    FLUSH_INTERVAL секунд добавляются к общим значениям в cache, так
+    что totals() показывает сумму по всем процессам.
+    """
+
+    def __init__(self, cache, prefix, names):
+        self.cache = cache
+        self.names = names
+        self.keys = {name: f"{prefix}:stats:{name}" for name in names}
+        self._lock = threading.Lock()
+        self._take()
+
+    def _take(self):
+        counts = getattr(self, "_counts", {})
+        self._counts = dict.fromkeys(self.names, 0)
+        self._flushed_at = time.monotonic()
+        return counts
+
+    def record(self, name):
+        with self._lock:
+            self._counts[name] += 1
+            if time.monotonic() - self._flushed_at < FLUSH_INTERVAL:
+                return
+            counts = self._take()
+        self._flush(counts)
+
+    def _flush(self, counts):
+        for name, delta in counts.items():
+            if not delta:
+                continue
+            key = self.keys[name]
+            if self.cache.add(key, delta, None):
+                continue
+            try:
+                self.cache.incr(key, delta)
+            except ValueError:
+                self.cache.set(key, delta, None)
+
+    def flush(self):
+        with self._lock:
+            counts = self._take()
+        self._flush(counts)
+
+    def totals(self):
+        self.flush()
+        shared = self.cache.get_many(list(self.keys.values()))
+        return {
+            name: shared.get(key, 0) for name, key in self.keys.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._take()
+        self.cache.delete_many(list(self.keys.values()))
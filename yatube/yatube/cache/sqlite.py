@@ -0,0 +1,267 @@
+"""
+Общий для всех процессов хоста кэш в файле SQLite в режиме WAL.
+
+В отличие от LocMemCache записи видны всем воркерам, а в отличие от
+memcached/Redis не нужен отдельный сервер. Читатели в режиме WAL не
+блокируют друг друга и писателя; записи сериализуются самим SQLite.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "yatube.cache.SQLiteCache",
+            "LOCATION": "/var/tmp/yatube-cache.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+    }
+
+Вытесняются давно не читанные записи (LRU). Время последнего чтения
+обновляется не чаще раза в ACCESS_RESOLUTION секунд, чтобы чтения
+почти никогда не превращались в записи, и только если базу в этот
+момент никто не пишет: чтение не ждёт писателя и не падает из-за него.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+ACCESS_RESOLUTION = 1.0
+CULL_INTERVAL = 50
+BUSY_TIMEOUT = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+"""
+
+INTEGER_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _dump(value):
+    # Integers are stored as they are, which keeps counters readable.
+    if type(value) is int and value in INTEGER_RANGE:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def _load(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    # Connections
+
+    @property
+    def _db(self):
+        # One connection per thread; a forked worker opens its own.
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            self._local.pid = pid
+            self._local.db = self._connect()
+        return self._local.db
+
+    def _connect(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+            check_same_thread=False,
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _write(self, statements):
+        """Выполняет statements (пары SQL, параметры) в одной транзакции."""
+        with self._transaction() as db:
+            results = [db.execute(sql, args).rowcount
+                       for sql, args in statements]
+        self._writes += len(statements)
+        if self._writes >= CULL_INTERVAL:
+            self._writes = 0
+            self._cull()
+        return results
+
+    def _cull(self):
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+            count = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count <= self._max_entries:
+                return
+            if self._cull_frequency == 0:
+                db.execute("DELETE FROM cache")
+                return
+            surplus = (count - self._max_entries
+                       + self._max_entries // self._cull_frequency)
+            # Least recently read entries go first.
+            db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY accessed LIMIT ?)",
+                (surplus,),
+            )
+
+    # Helpers
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _upsert(self, key, value, timeout, now):
+        return (
+            "INSERT INTO cache (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+            "value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed",
+            (key, _dump(value), self.get_backend_timeout(timeout), now),
+        )
+
+    def _read(self, keys):
+        now = time.time()
+        rows = self._db.execute(
+            "SELECT key, value, accessed FROM cache WHERE key IN (%s) "
+            "AND (expires IS NULL OR expires > ?)"
+            % ", ".join("?" * len(keys)),
+            (*keys, now),
+        ).fetchall()
+        touched = [key for key, _, accessed in rows
+                   if now - accessed > ACCESS_RESOLUTION]
+        if touched:
+            self._touch_accessed(touched, now)
+        return {key: _load(value) for key, value, _ in rows}
+
+    def _touch_accessed(self, keys, now):
+        # Access times only steer eviction, so the update is skipped
+        # rather than waiting for a busy writer or failing the read.
+        db = self._db
+        db.execute("PRAGMA busy_timeout = 0")
+        try:
+            db.execute(
+                "UPDATE cache SET accessed = ? WHERE key IN (%s)"
+                % ", ".join("?" * len(keys)),
+                (now, *keys),
+            )
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            db.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}")
+
+    # Cache API
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        inserted, = self._write([(
+            "INSERT INTO cache (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+            "value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, _dump(value), self.get_backend_timeout(timeout), now, now),
+        )])
+        return inserted == 1
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._read([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        if not made:
+            return {}
+        values = self._read(list(made))
+        return {made[key]: value for key, value in values.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write([self._upsert(key, value, timeout, time.time())])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        if data:
+            self._write([
+                self._upsert(self._key(key, version), value, timeout, now)
+                for key, value in data.items()
+            ])
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        touched, = self._write([(
+            "UPDATE cache SET expires = ?, accessed = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), now, key, now),
+        )])
+        return touched == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = _load(row[0]) + delta
+            db.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                (_dump(value), key),
+            )
+        return value
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        deleted, = self._write([
+            ("DELETE FROM cache WHERE key = ?", (key,)),
+        ])
+        return deleted == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._write([
+                ("DELETE FROM cache WHERE key = ?", (key,)) for key in keys
+            ])
+
+    def clear(self):
+        self._write([("DELETE FROM cache", ())])
@@ -0,0 +1,219 @@
+"""
+Кэш с защитой от «набега» при истечении записей.
+
+StaleWhileRevalidateCache оборачивает обычный бэкенд Django. Значение
+хранится вместе с мягким сроком годности, а в нижележащем кэше живёт
+ещё GRACE_PERIOD секунд сверх него. Когда мягкий срок прошёл, первый
+пришедший процесс берёт короткую блокировку (атомарный add) и получает
+промах — он и пересчитывает значение, — а остальные, пока блокировка
+держится, получают устаревшее значение вместо похода в базу.
+
+Подходит и для {% cache %}, и для прямых вызовов django.core.cache.
+Целые числа (счётчики, флаги блокировок) хранятся без конверта и
+истекают точно в срок, поэтому incr/decr атомарны, если атомарен
+нижележащий кэш.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "yatube.cache.StaleWhileRevalidateCache",
+            "OPTIONS": {
+                "CACHE": {"BACKEND": "...LocMemCache"},
+                "GRACE_PERIOD": 60,
+                "LOCK_TIMEOUT": 10,
+            },
+        },
+    }
+"""
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .base import Counters, create_cache
+
+GRACE_PERIOD = 60
+LOCK_TIMEOUT = 10
+
+LOCK_KEY = "swr:lock:{}"
+STATS = ("hits", "misses", "stale", "regenerations")
+
+
+class StaleWhileRevalidateCache(BaseCache):
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get("OPTIONS", {}))
+        self._cache = create_cache(options.pop("CACHE", {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": location,
+        }))
+        self.grace_period = options.pop("GRACE_PERIOD", GRACE_PERIOD)
+        self.lock_timeout = options.pop("LOCK_TIMEOUT", LOCK_TIMEOUT)
+        params["OPTIONS"] = options
+        super().__init__(params)
+        self._locks = set()
+        self._counters = Counters(self._cache, "swr", STATS)
+
+    # Envelopes
+
+    def _wrap(self, value, timeout):
+        """Конверт для значения и время жизни в нижележащем кэше."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if isinstance(value, int):
+            # Stored as is, so that the inner incr() can update them.
+            return value, timeout
+        if timeout is None:
+            return (value, None), None
+        if timeout <= 0:
+            return (value, None), 0
+        # Keys are passed through, so the inner backend does the making
+        # and validation; only the TTL is stretched by the grace period.
+        return (value, time.time() + timeout), timeout + self.grace_period
+
+    def _unwrap(self, key, envelope, default, version):
+        if envelope is None:
+            self._record("misses")
+            return default
+        if not isinstance(envelope, tuple):
+            self._record("hits")
+            return envelope
+        value, expires = envelope
+        if expires is None or expires > time.time():
+            self._record("hits")
+            return value
+        lock = LOCK_KEY.format(key)
+        if self._cache.add(lock, True, self.lock_timeout, version=version):
+            # This caller rebuilds the value; everyone else gets the old
+            # one until it is set again.
+            self._locks.add((key, version))
+            self._record("regenerations")
+            return default
+        self._record("stale")
+        return value
+
+    def _release(self, key, version):
+        if (key, version) in self._locks:
+            self._locks.discard((key, version))
+            self._cache.delete(LOCK_KEY.format(key), version=version)
+
+    # Metrics
+
+    def _record(self, name):
+        self._counters.record(name)
+
+    def stats(self):
+        """Счётчики всех процессов: попадания, промахи, устаревшие
+        ответы и пересчёты, а также статистика нижележащего кэша."""
+        counts = self._counters.totals()
+        lookups = sum(counts.values())
+        counts["stale_ratio"] = (
+            counts["stale"] / lookups if lookups else 0.0
+        )
+        if hasattr(self._cache, "stats"):
+            counts.update(self._cache.stats())
+        return counts
+
+    def reset_stats(self):
+        self._counters.reset()
+        if hasattr(self._cache, "reset_stats"):
+            self._cache.reset_stats()
+
+    # Cache API
+
+    def _is_stale(self, envelope):
+        return (
+            isinstance(envelope, tuple)
+            and envelope[1] is not None
+            and envelope[1] <= time.time()
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        envelope, backend_timeout = self._wrap(value, timeout)
+        if self._cache.add(key, envelope, backend_timeout, version=version):
+            return True
+        if not self._is_stale(self._cache.get(key, version=version)):
+            return False
+        # A stale entry counts as missing; of several callers only the
+        # one that takes the regeneration lock replaces it.
+        lock = LOCK_KEY.format(key)
+        if not self._cache.add(lock, True, self.lock_timeout,
+                               version=version):
+            return False
+        self._locks.add((key, version))
+        self.set(key, value, timeout, version=version)
+        return True
+
+    def get(self, key, default=None, version=None):
+        envelope = self._cache.get(key, version=version)
+        return self._unwrap(key, envelope, default, version)
+
+    def get_many(self, keys, version=None):
+        envelopes = self._cache.get_many(keys, version=version)
+        values = {}
+        for key in keys:
+            value = self._unwrap(key, envelopes.get(key), None, version)
+            if value is not None:
+                values[key] = value
+        return values
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        value = self.get(key, version=version)
+        if value is None:
+            value = default() if callable(default) else default
+            if value is not None:
+                # A stale entry is still there, so add() would not do.
+                self.set(key, value, timeout, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        envelope, timeout = self._wrap(value, timeout)
+        self._cache.set(key, envelope, timeout, version=version)
+        self._release(key, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        # Integers and envelopes live for different times in the inner
+        # backend, so each TTL gets its own set_many().
+        groups = {}
+        for key, value in data.items():
+            envelope, backend_timeout = self._wrap(value, timeout)
+            groups.setdefault(backend_timeout, {})[key] = envelope
+        failed = []
+        for backend_timeout, envelopes in groups.items():
+            failed += self._cache.set_many(
+                envelopes, backend_timeout, version=version
+            )
+        for key in data:
+            self._release(key, version)
+        return failed
+
+    def incr(self, key, delta=1, version=None):
+        # Integers are not wrapped, see _wrap().
+        return self._cache.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        envelope = self._cache.get(key, version=version)
+        if envelope is None:
+            return False
+        if not isinstance(envelope, tuple):
+            return self._cache.touch(key, timeout, version=version)
+        self.set(key, envelope[0], timeout, version=version)
+        return True
+
+    def delete(self, key, version=None):
+        return self._cache.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        self._cache.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self._cache.has_key(key, version=version)
+
+    def clear(self):
+        self._locks.clear()
+        self._cache.clear()
+
+    def close(self, **kwargs):
+        self._cache.close(**kwargs)
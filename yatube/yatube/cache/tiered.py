@@ -0,0 +1,270 @@
+"""
+Двухуровневый кэш: небольшой LRU в памяти процесса (L1) перед общим
+кэшем (L2).
+
+Горячие ключи — первая страница, версии областей, счётчики — читаются
+из L1 без обращения к L2 и без распаковки. Значения из L1 отдаются как
+есть, поэтому их нельзя изменять на месте.
+
+Записи в L1 живут не дольше L1_TIMEOUT секунд. Кроме того, каждая
+запись через этот кэш увеличивает в L2 порядковый номер и кладёт под
+ним список изменённых ключей; раз в CHECK_INTERVAL секунд процессы
+сверяют номер и выбрасывают из L1 изменённые другими процессами ключи.
+Если часть журнала потерялась, L1 очищается целиком. Если L2 виден
+только своему процессу (по умолчанию — LocMemCache), журнал не ведётся:
+читать его некому, а записи журнала вытесняли бы из L2 полезные ключи.
+Общий ли L2, можно указать явно опцией SHARED.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "yatube.cache.TieredCache",
+            "OPTIONS": {
+                "CACHE": {"BACKEND": "yatube.cache.SQLiteCache", ...},
+                "L1_MAX_ENTRIES": 1000,
+                "L1_TIMEOUT": 5,
+            },
+        },
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .base import Counters, create_cache
+
+L1_MAX_ENTRIES = 1000
+L1_TIMEOUT = 5
+CHECK_INTERVAL = 1
+LOG_SIZE = 1000
+LOG_TIMEOUT = 300
+
+SEQUENCE_KEY = "tiered:sequence"
+LOG_KEY = "tiered:log:{}"
+CLEAR = "*"
+STATS = ("l1_hits", "l2_hits", "misses")
+# Backends whose entries no other process can see.
+PROCESS_LOCAL = (LocMemCache, DummyCache)
+
+_missing = object()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get("OPTIONS", {}))
+        self._l2 = create_cache(options.pop("CACHE", {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": location,
+        }))
+        self.shared = options.pop(
+            "SHARED", not isinstance(self._l2, PROCESS_LOCAL)
+        )
+        self.l1_max_entries = options.pop("L1_MAX_ENTRIES", L1_MAX_ENTRIES)
+        self.l1_timeout = options.pop("L1_TIMEOUT", L1_TIMEOUT)
+        params["OPTIONS"] = options
+        super().__init__(params)
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._seen = None
+        self._checked_at = None
+        self._counters = Counters(self._l2, "tiered", STATS)
+
+    # L1
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _missing
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._l1[key]
+                return _missing
+            self._l1.move_to_end(key)
+            return value
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        ttl = self.l1_timeout if timeout is None else min(
+            self.l1_timeout, timeout
+        )
+        if ttl <= 0:
+            self._l1_discard([key])
+            return
+        with self._lock:
+            self._l1[key] = (value, time.monotonic() + ttl)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_discard(self, keys):
+        with self._lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    # Invalidation log
+
+    def _publish(self, changed):
+        """Сообщает другим процессам, что ключи changed изменились."""
+        if not self.shared:
+            return
+        if self._l2.add(SEQUENCE_KEY, 1, None):
+            number = 1
+        else:
+            number = self._l2.incr(SEQUENCE_KEY)
+        self._l2.set(LOG_KEY.format(number), changed, LOG_TIMEOUT)
+        with self._lock:
+            if self._seen == number - 1:
+                # Nothing new from others, and our own change is in L1.
+                self._seen = number
+
+    def _sync(self):
+        if not self.shared:
+            return
+        now = time.monotonic()
+        if (self._checked_at is not None
+                and now - self._checked_at < CHECK_INTERVAL):
+            return
+        self._checked_at = now
+        number = self._l2.get(SEQUENCE_KEY, 0)
+        seen = self._seen
+        if seen is None or number == seen:
+            self._seen = number
+            return
+        if seen < number <= seen + LOG_SIZE:
+            keys = [LOG_KEY.format(n) for n in range(seen + 1, number + 1)]
+            entries = self._l2.get_many(keys)
+            if len(entries) == len(keys):
+                changed = [entry for key in keys for entry in entries[key]]
+            else:
+                changed = [CLEAR]
+        else:
+            # The sequence was reset by clear() or ran too far ahead.
+            changed = [CLEAR]
+        if CLEAR in changed:
+            with self._lock:
+                self._l1.clear()
+        else:
+            self._l1_discard(changed)
+        self._seen = number
+
+    # Metrics
+
+    def stats(self):
+        """Попадания в L1 и L2 по всем процессам и их доли."""
+        counts = self._counters.totals()
+        lookups = sum(counts.values())
+        l2_lookups = lookups - counts["l1_hits"]
+        counts["l1_hit_ratio"] = (
+            counts["l1_hits"] / lookups if lookups else 0.0
+        )
+        counts["l2_hit_ratio"] = (
+            counts["l2_hits"] / l2_lookups if l2_lookups else 0.0
+        )
+        return counts
+
+    def reset_stats(self):
+        self._counters.reset()
+
+    # Cache API
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Nobody can hold a key that was missing in L2 for longer than
+        # L1_TIMEOUT, so a successful add needs no log entry.
+        added = self._l2.add(key, value, timeout, version=version)
+        if added:
+            self._l1_set((key, version), value, timeout)
+        return added
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        value = self._l1_get((key, version))
+        if value is not _missing:
+            self._counters.record("l1_hits")
+            return value
+        value = self._l2.get(key, _missing, version=version)
+        if value is _missing:
+            self._counters.record("misses")
+            return default
+        self._counters.record("l2_hits")
+        self._l1_set((key, version), value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        values = {}
+        remote = []
+        for key in keys:
+            value = self._l1_get((key, version))
+            if value is _missing:
+                remote.append(key)
+            else:
+                self._counters.record("l1_hits")
+                values[key] = value
+        if remote:
+            loaded = self._l2.get_many(remote, version=version)
+            for key in remote:
+                if key in loaded:
+                    self._counters.record("l2_hits")
+                    self._l1_set((key, version), loaded[key])
+                else:
+                    self._counters.record("misses")
+            values.update(loaded)
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l2.set(key, value, timeout, version=version)
+        self._l1_set((key, version), value, timeout)
+        self._publish([(key, version)])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        failed = self._l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1_set((key, version), value, timeout)
+        self._publish([(key, version) for key in data])
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._l2.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self._l2.incr(key, delta, version=version)
+        self._l1_discard([(key, version)])
+        self._publish([(key, version)])
+        return value
+
+    def has_key(self, key, version=None):
+        if self._l1_get((key, version)) is not _missing:
+            return True
+        return self._l2.has_key(key, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self._l2.delete(key, version=version)
+        self._l1_discard([(key, version)])
+        self._publish([(key, version)])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return
+        self._l2.delete_many(keys, version=version)
+        self._l1_discard([(key, version) for key in keys])
+        self._publish([(key, version) for key in keys])
+
+    def clear(self):
+        self._l2.clear()
+        with self._lock:
+            self._l1.clear()
+        self._publish([CLEAR])
+
+    def close(self, **kwargs):
+        self._l2.close(**kwargs)
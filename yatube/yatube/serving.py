@@ -0,0 +1,304 @@
+"""
+Раздача загруженных файлов (MEDIA_ROOT) и статики (STATIC_ROOT) самим
+приложением.
+
+В отличие от django.views.static.serve, которая годится только для
+DEBUG, здесь есть всё, что нужно в бою:
+
+* сильный ETag (размер и mtime файла) и Last-Modified, ответы 304 на
+  If-None-Match и If-Modified-Since;
+* запросы диапазонов (Range, If-Range) с ответами 206 и 416;
+* Cache-Control: immutable на год для имён с хэшем содержимого
+  (MEDIA_IMMUTABLE_RE), остальным — MEDIA_MAX_AGE секунд;
+* Content-Type только картинок (MEDIA_CONTENT_TYPES) и nosniff:
+  остальное отдаётся как application/octet-stream;
+* передача файла без копирования: FileResponse отдаёт настоящий файл,
+  и WSGI-сервер с wsgi.file_wrapper (gunicorn, uWSGI) шлёт его через
+  sendfile(); при MEDIA_SENDFILE = "x-accel-redirect" или "x-sendfile"
+  тело не читается вовсе, а файл отдаёт nginx или Apache.
+
+Статика отдаётся заранее сжатой копией (file.br, file.gz, см.
+yatube.staticfiles), если клиент её принимает, а файлы с хэшем
+манифеста в имени кэшируются навсегда.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+MAX_AGE = 60 * 60
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# Content-addressed originals (sha256) and sorl thumbnails (md5 of the
+# thumbnail key) never change under the same name.
+IMMUTABLE_RE = r"(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32,64}\.\w+$"
+ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# ManifestStaticFilesStorage adds the first 12 digits of the md5.
+STATIC_IMMUTABLE_RE = re.compile(r"\.[0-9a-f]{12}\.\w+$")
+# Preferred first.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+# Originals and thumbnails; any other file is sent as opaque bytes, so a
+# browser never renders it as a page.
+MEDIA_CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+}
+
+X_ACCEL_REDIRECT = "x-accel-redirect"
+X_SENDFILE = "x-sendfile"
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """Файл, из которого читается только length байт с позиции start."""
+
+    def __init__(self, file_, start, length):
+        file_.seek(start)
+        self.file = file_
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # Lets sendfile() based file wrappers send the range directly;
+        # they start at the current offset and stop at Content-Length.
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def make_etag(stat_result):
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    Диапазон (start, end) из заголовка Range для файла размером size.
+    None — заголовка нет или он не понят (отдаётся весь файл),
+    False — диапазон вне файла.
+    """
+    match = RANGE_RE.match(header or "")
+    if match is None:
+        # Multiple ranges are allowed to be answered with the whole file.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # The last N bytes.
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def cache_control(immutable):
+    if immutable:
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={getattr(settings, 'MEDIA_MAX_AGE', MAX_AGE)}"
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых (q=0)."""
+    accepted = set()
+    for item in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip().replace(" ", "")
+        if quality in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _range_applies(request, etag, mtime):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    # If-Range needs a strong match: the same ETag or exact date.
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def _stat(full_path, path):
+    """Результат os.stat() обычного файла full_path; иначе 404."""
+    try:
+        stat_result = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404(f"Файл {path} не найден")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404(f"Файл {path} не найден")
+    return stat_result
+
+
+def _requested_range(request, etag, stat_result):
+    """Диапазон запроса с учётом If-Range, как у parse_range()."""
+    if not _range_applies(request, etag, stat_result.st_mtime):
+        return None
+    return parse_range(request.META.get("HTTP_RANGE"), stat_result.st_size)
+
+
+def _body_response(request, full_path, size, content_type, byte_range,
+                   accel_path):
+    """
+    Ответ с телом файла или без него (HEAD, X-Accel-Redirect,
+    X-Sendfile). Возвращает ответ и диапазон, который осталось в нём
+    указать.
+    """
+    sendfile = accel_path and getattr(settings, "MEDIA_SENDFILE", None)
+    if sendfile == X_ACCEL_REDIRECT:
+        # nginx answers Range and conditional requests itself.
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(
+            settings, "MEDIA_ACCEL_REDIRECT_PREFIX", ACCEL_REDIRECT_PREFIX
+        )
+        response["X-Accel-Redirect"] = quote(prefix + accel_path)
+        return response, None
+    if sendfile == X_SENDFILE:
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = quote(full_path)
+        return response, None
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+        response["Content-Length"] = size
+        return response, byte_range
+    file_ = open(full_path, "rb")
+    if byte_range is not None:
+        start, end = byte_range
+        file_ = RangeFile(file_, start, end - start + 1)
+    return FileResponse(file_, content_type=content_type), byte_range
+
+
+def serve_file(request, full_path, immutable=False, content_type=None,
+               encoding=None, accel_path=None):
+    """
+    Ответ с файлом full_path. content_type и encoding описывают
+    содержимое (для сжатой копии — исходный тип и её сжатие);
+    accel_path — имя файла для X-Accel-Redirect, если файл можно
+    отдать через веб-сервер.
+    """
+    stat_result = _stat(full_path, accel_path or os.path.basename(full_path))
+    size = stat_result.st_size
+    etag = make_etag(stat_result)
+    if content_type is None:
+        content_type, guessed_encoding = mimetypes.guess_type(full_path)
+        if guessed_encoding or not content_type:
+            # Like FileResponse: .gz must not be decoded by the browser.
+            content_type = "application/octet-stream"
+
+    headers = HttpResponse()
+    headers["ETag"] = etag
+    headers["Last-Modified"] = http_date(stat_result.st_mtime)
+    headers["Cache-Control"] = cache_control(immutable)
+    headers["Accept-Ranges"] = "bytes"
+    conditional = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat_result.st_mtime),
+        response=headers,
+    )
+    if conditional is not headers:
+        return conditional
+
+    byte_range = _requested_range(request, etag, stat_result)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    response, byte_range = _body_response(
+        request, full_path, size, content_type, byte_range, accel_path
+    )
+    if byte_range is not None:
+        start, end = byte_range
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    for header in ("ETag", "Last-Modified", "Cache-Control",
+                   "Accept-Ranges"):
+        response[header] = headers[header]
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
+
+
+@require_safe
+def media(request, path):
+    """Отдаёт файл path из MEDIA_ROOT."""
+    # Paths outside MEDIA_ROOT raise SuspiciousFileOperation (400).
+    full_path = safe_join(settings.MEDIA_ROOT, path)
+    pattern = getattr(settings, "MEDIA_IMMUTABLE_RE", IMMUTABLE_RE)
+    extension = os.path.splitext(path)[1].lower()
+    response = serve_file(
+        request,
+        full_path,
+        immutable=bool(pattern and re.search(pattern, path)),
+        content_type=MEDIA_CONTENT_TYPES.get(
+            extension, "application/octet-stream"
+        ),
+        accel_path=path,
+    )
+    response["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+@require_safe
+def static(request, path):
+    """
+    Отдаёт файл path из STATIC_ROOT, по возможности заранее сжатую
+    копию.
+    """
+    full_path = safe_join(settings.STATIC_ROOT, path)
+    immutable = STATIC_IMMUTABLE_RE.search(path) is not None
+    accepted = accepted_encodings(request)
+    content_type = None
+    for encoding, suffix in PRECOMPRESSED:
+        if not os.path.isfile(full_path + suffix):
+            continue
+        if content_type is None:
+            content_type = (
+                mimetypes.guess_type(full_path)[0]
+                or "application/octet-stream"
+            )
+        if encoding in accepted:
+            response = serve_file(
+                request,
+                full_path + suffix,
+                immutable=immutable,
+                content_type=content_type,
+                encoding=encoding,
+            )
+            break
+    else:
+        response = serve_file(
+            request, full_path, immutable=immutable,
+            content_type=content_type,
+        )
+    if content_type is not None:
+        # Some copy exists, so the answer depends on Accept-Encoding.
+        patch_vary_headers(response, ("Accept-Encoding",))
+    return response
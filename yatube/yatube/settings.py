@@ -57,6 +57,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "posts.middleware.HolePunchMiddleware",
 ]
 
 ROOT_URLCONF = "yatube.urls"
@@ -130,11 +131,22 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# Hashed names plus .gz/.br copies written by collectstatic, served by
+# yatube.serving.static
+STATICFILES_STORAGE = "yatube.staticfiles.CompressedManifestStaticFilesStorage"
 
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Media is served by yatube.serving.media. With MEDIA_SENDFILE set to
+# "x-accel-redirect" (nginx, internal location MEDIA_ACCEL_REDIRECT_PREFIX)
+# or "x-sendfile" (Apache) the file body is sent by the web server
+
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+MEDIA_MAX_AGE = 60 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -150,8 +162,65 @@ LOGIN_REDIRECT_URL = "posts:index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Expired entries are served for GRACE_PERIOD more seconds while a single
+# worker rebuilds them, see yatube/cache/swr.py. With YATUBE_CACHE_FILE set
+# all worker processes of the host share one SQLite cache file, and hot
+# keys are kept in a small per-process L1 in front of it, see
+# yatube/cache/tiered.py. Otherwise every process has its own cache.
+
+CACHE_FILE = os.environ.get('YATUBE_CACHE_FILE')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.cache.StaleWhileRevalidateCache',
+        'OPTIONS': {
+            'CACHE': {
+                'BACKEND': 'yatube.cache.TieredCache',
+                'OPTIONS': {
+                    'CACHE': {
+                        'BACKEND': 'yatube.cache.SQLiteCache',
+                        'LOCATION': CACHE_FILE,
+                        'OPTIONS': {'MAX_ENTRIES': 100000},
+                    },
+                    'L1_MAX_ENTRIES': 1000,
+                    'L1_TIMEOUT': 5,
+                },
+            } if CACHE_FILE else {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'OPTIONS': {'MAX_ENTRIES': 10000},
+            },
+            'GRACE_PERIOD': 60,
+            'LOCK_TIMEOUT': 10,
+        },
     }
 }
+
+# Post listings are invalidated by version bumps, so they may live long
+
+POSTS_LISTING_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Follow feed: "timeline" (fan-out-on-write), "merge" (k-way merge of
+# cached per-author lists) or "query" (plain subquery). After switching
+# to "timeline" from another engine run `manage.py rebuild_timelines`
+
+POSTS_FEED_ENGINE = "timeline"
+POSTS_FEED_AUTHOR_DEPTH = 200
+
+# Post image thumbnails, generated after upload by a thread pool of
+# POSTS_THUMBNAIL_WORKERS threads (0 generates them right after commit).
+# Every size also gets srcset variants of POSTS_THUMBNAIL_WIDTHS in those
+# POSTS_THUMBNAIL_FORMATS that Pillow and sorl can write
+
+POSTS_THUMBNAILS = {
+    "card": ("960x339", {"crop": "center", "upscale": True}),
+}
+POSTS_THUMBNAIL_WIDTHS = (480, 960, 1440)
+POSTS_THUMBNAIL_FORMATS = ("AVIF", "WEBP")
+POSTS_THUMBNAIL_WORKERS = 2
+
+# Images uploaded in parts are kept here until they become post images
+
+POSTS_UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
+POSTS_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+POSTS_UPLOAD_MAX_OPEN = 10
+POSTS_UPLOAD_MAX_AGE = 24 * 60 * 60
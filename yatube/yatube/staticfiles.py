@@ -0,0 +1,93 @@
+"""
+Хранилище статики для collectstatic: имена с хэшем содержимого и
+заранее сжатые копии.
+
+Кроме файлов с хэшем в имени (ManifestStaticFilesStorage) для
+текстовых файлов рядом пишутся file.gz и, если установлен пакет
+brotli, file.br — только когда сжатие действительно уменьшает файл.
+yatube.serving.static выбирает подходящую копию по Accept-Encoding,
+так что при запросе ничего не сжимается.
+
+Если файла нет в манифесте (collectstatic ещё не запускали), {% static %}
+возвращает исходное имя вместо ошибки.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    ".css", ".js", ".mjs", ".map", ".svg", ".html", ".txt", ".json",
+    ".xml", ".ico", ".ttf", ".otf", ".eot",
+)
+# A compressed copy that saves less is not worth a second file.
+MIN_RATIO = 0.95
+
+
+def _gzip(data):
+    # mtime=0 makes the output depend on the content only.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def get_encodings():
+    """Доступные сжатия: (расширение копии, функция сжатия)."""
+    encodings = [(".gz", _gzip)]
+    if brotli is not None:
+        encodings.insert(0, (".br", _brotli))
+    return encodings
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Neither in the manifest nor in STATIC_ROOT.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        processed_files = super().post_process(
+            paths, dry_run=dry_run, **options
+        )
+        for name, hashed_name, processed in processed_files:
+            yield name, hashed_name, processed
+            if isinstance(processed, Exception):
+                continue
+            names.add(name)
+            if hashed_name:
+                names.add(hashed_name)
+        if dry_run:
+            return
+        for name in sorted(names):
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Пишет сжатые копии файла name; возвращает их имена."""
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+            return []
+        with self.open(name) as file_:
+            data = file_.read()
+        written = []
+        for suffix, compress in get_encodings():
+            compressed = compress(data)
+            if len(compressed) >= len(data) * MIN_RATIO:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+            written.append(name + suffix)
+        return written
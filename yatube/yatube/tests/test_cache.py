@@ -0,0 +1,157 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import InvalidCacheBackendError
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from yatube.cache import StaleWhileRevalidateCache
+
+NOW = 1_000_000.0
+
+
+class OnlyDefault(dict):
+    def __missing__(self, alias):
+        raise InvalidCacheBackendError(alias)
+
+
+class TestStaleWhileRevalidateCache(SimpleTestCase):
+    def setUp(self):
+        self.cache = StaleWhileRevalidateCache("", {
+            "OPTIONS": {
+                "CACHE": {
+                    "BACKEND":
+                        "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "swr-tests",
+                },
+                "GRACE_PERIOD": 30,
+                "LOCK_TIMEOUT": 5,
+            },
+        })
+        self.cache.clear()
+        self.cache.reset_stats()
+        clock = mock.patch("yatube.cache.swr.time.time", return_value=NOW)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+
+    def expire(self, seconds):
+        self.clock.return_value = NOW + seconds
+
+    def test_fresh_value_is_returned(self):
+        """До истечения срока значение отдаётся как обычно."""
+        self.cache.set("key", "value", 10)
+
+        self.assertEqual(self.cache.get("key"), "value")
+
+    def test_only_one_caller_regenerates_stale_value(self):
+        """После истечения срока промах получает только один вызов,
+        остальные получают старое значение."""
+        self.cache.set("key", "old", 10)
+        self.expire(15)
+
+        results = [self.cache.get("key") for _ in range(3)]
+
+        self.assertEqual(results, [None, "old", "old"])
+        self.cache.set("key", "new", 10)
+        self.assertEqual(self.cache.get("key"), "new")
+
+    def test_get_or_set_replaces_stale_value(self):
+        """get_or_set пересчитывает устаревшее значение."""
+        self.cache.set("key", "old", 10)
+        self.expire(15)
+
+        value = self.cache.get_or_set("key", lambda: "new", 10)
+
+        self.assertEqual(value, "new")
+        self.assertEqual(self.cache.get("key"), "new")
+
+    def test_zero_timeout_is_not_kept_for_grace_period(self):
+        """Нулевой срок по-прежнему означает «не кэшировать»."""
+        self.cache.set("key", "value", 0)
+
+        self.assertIsNone(self.cache.get("key"))
+
+    def test_template_fragments_are_served_stale(self):
+        """{% cache %} отдаёт старый фрагмент, пока его пересчитывают."""
+        template = Template("{% load cache %}{% cache 10 frag %}"
+                            "{{ value }}{% endcache %}")
+        with mock.patch("django.templatetags.cache.caches",
+                        OnlyDefault(default=self.cache)):
+            template.render(Context({"value": "old"}))
+            self.expire(15)
+            # Another worker has taken the lock and is rebuilding.
+            self.cache.get(make_template_fragment_key("frag"))
+
+            rendered = template.render(Context({"value": "new"}))
+
+        self.assertEqual(rendered, "old")
+
+    def test_add_replaces_stale_value(self):
+        """add() считает устаревшую запись отсутствующей."""
+        self.cache.set("key", "old", 10)
+        self.expire(15)
+
+        self.assertTrue(self.cache.add("key", "new", 10))
+        self.assertFalse(self.cache.add("key", "newer", 10))
+        self.assertEqual(self.cache.get("key"), "new")
+
+    def test_incr_keeps_counter_without_expiry(self):
+        """incr() обновляет счётчик в нижележащем кэше, не меняя срок."""
+        self.cache.set("counter", 1, None)
+
+        self.assertEqual(self.cache.incr("counter", 2), 3)
+        self.assertEqual(self.cache.decr("counter"), 2)
+        self.expire(10 ** 6)
+        self.assertEqual(self.cache.get("counter"), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_set_many_keeps_each_ttl(self):
+        """set_many() передаёт каждому значению его собственный срок."""
+        with mock.patch.object(
+            self.cache._cache, "set_many", return_value=[]
+        ) as set_many:
+            self.cache.set_many({"text": "value", "counter": 1}, 10)
+
+        self.assertCountEqual(
+            [(set(call[0][0]), call[0][1])
+             for call in set_many.call_args_list],
+            [({"text"}, 40), ({"counter"}, 10)],
+        )
+
+    def test_incr_over_sqlite_cache(self):
+        """incr() работает поверх SQLiteCache."""
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        cache = StaleWhileRevalidateCache("", {
+            "OPTIONS": {
+                "CACHE": {
+                    "BACKEND": "yatube.cache.SQLiteCache",
+                    "LOCATION": f"{workdir}/cache.sqlite3",
+                },
+            },
+        })
+        cache.set("counter", 1)
+
+        self.assertEqual(cache.incr("counter"), 2)
+        self.assertEqual(cache.get("counter"), 2)
+
+    def test_stats_count_stale_hits(self):
+        """Статистика показывает долю устаревших ответов."""
+        self.cache.set("key", "old", 10)
+        self.cache.get("key")
+        self.expire(15)
+        self.cache.get("key")
+        self.cache.get("key")
+        self.cache.get("missing")
+
+        stats = self.cache.stats()
+
+        self.assertEqual(
+            {name: stats[name] for name in
+             ("hits", "misses", "stale", "regenerations")},
+            {"hits": 1, "misses": 1, "stale": 1, "regenerations": 1},
+        )
+        self.assertEqual(stats["stale_ratio"], 0.25)
@@ -0,0 +1,194 @@
+import gzip
+import mimetypes
+import os
+import shutil
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from yatube import serving
+from yatube.staticfiles import CompressedManifestStaticFilesStorage
+
+CONTENT = bytes(range(256)) * 4
+HASHED_NAME = "posts/ab/cd/" + "abcd" * 16 + ".jpg"
+SCRIPT = b"document.title = 'Yatube';\n" * 100
+
+
+class TestMediaServing(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for name in ("posts/plain.jpg", HASHED_NAME):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file_:
+                file_.write(CONTENT)
+
+    def get(self, name, **headers):
+        return self.client.get(f"/media/{name}", **headers)
+
+    def test_whole_file(self):
+        """Файл отдаётся целиком с валидаторами и заголовками кэша."""
+        response = self.get("posts/plain.jpg")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertFalse(response["ETag"].startswith("W/"))
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+    def test_only_images_get_their_type(self):
+        """Файлы не с картинками не открываются браузером как страницы."""
+        path = os.path.join(self.media_root, "posts/evil.html")
+        with open(path, "wb") as file_:
+            file_.write(b"<script>alert(1)</script>")
+
+        response = self.get("posts/evil.html")
+
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+    def test_hashed_name_is_immutable(self):
+        """Файлы с хэшем в имени кэшируются навсегда."""
+        response = self.get(HASHED_NAME)
+
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_if_none_match(self):
+        """Совпавший ETag даёт 304 без тела."""
+        etag = self.get("posts/plain.jpg")["ETag"]
+
+        response = self.get("posts/plain.jpg", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        """Диапазоны отдаются с 206, неверные — с 416."""
+        cases = (
+            ("bytes=10-19", CONTENT[10:20], "bytes 10-19/1024"),
+            ("bytes=1000-", CONTENT[1000:], "bytes 1000-1023/1024"),
+            ("bytes=-4", CONTENT[-4:], "bytes 1020-1023/1024"),
+        )
+        for header, content, content_range in cases:
+            with self.subTest(header=header):
+                response = self.get("posts/plain.jpg", HTTP_RANGE=header)
+
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b"".join(response.streaming_content), content
+                )
+                self.assertEqual(response["Content-Range"], content_range)
+                self.assertEqual(
+                    int(response["Content-Length"]), len(content)
+                )
+
+        response = self.get("posts/plain.jpg", HTTP_RANGE="bytes=2000-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_gets_whole_file(self):
+        """Если файл изменился (If-Range не совпал), отдаётся весь
+        файл."""
+        response = self.get(
+            "posts/plain.jpg", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"'
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect")
+    def test_x_accel_redirect(self):
+        """В режиме X-Accel-Redirect тело отдаёт nginx."""
+        response = self.get("posts/plain.jpg")
+
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/posts/plain.jpg"
+        )
+        self.assertEqual(response.content, b"")
+
+    def test_sendfile_paths_are_quoted(self):
+        """Пути в X-Accel-Redirect и X-Sendfile кодируются для URL."""
+        name = "posts/кот и пёс.jpg"
+        with open(os.path.join(self.media_root, name), "wb") as file_:
+            file_.write(CONTENT)
+
+        with self.settings(MEDIA_SENDFILE="x-accel-redirect"):
+            accel = self.get(name)
+        with self.settings(MEDIA_SENDFILE="x-sendfile"):
+            sendfile = self.get(name)
+
+        self.assertEqual(
+            accel["X-Accel-Redirect"],
+            "/protected-media/posts/"
+            "%D0%BA%D0%BE%D1%82%20%D0%B8%20%D0%BF%D1%91%D1%81.jpg",
+        )
+        self.assertTrue(sendfile["X-Sendfile"].endswith(
+            "/posts/%D0%BA%D0%BE%D1%82%20%D0%B8%20%D0%BF%D1%91%D1%81.jpg"
+        ))
+
+    def test_outside_media_root(self):
+        """Файлы вне MEDIA_ROOT не отдаются."""
+        request = RequestFactory().get("/media/../settings.py")
+
+        with self.assertRaises(SuspiciousFileOperation):
+            serving.media(request, "../settings.py")
+
+
+class TestStaticServing(SimpleTestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        settings = override_settings(STATIC_ROOT=self.static_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=self.static_root
+        )
+        for name in ("app.js", "app.0123456789ab.js"):
+            with open(os.path.join(self.static_root, name), "wb") as file_:
+                file_.write(SCRIPT)
+            self.storage.compress(name)
+
+    def get(self, name, **headers):
+        return self.client.get(f"/static/{name}", **headers)
+
+    def test_compress(self):
+        """Рядом с текстовым файлом пишется его сжатая копия."""
+        with open(os.path.join(self.static_root, "app.js.gz"), "rb") as file_:
+            self.assertEqual(gzip.decompress(file_.read()), SCRIPT)
+        self.assertEqual(self.storage.compress("logo.png"), [])
+
+    def test_gzip_copy(self):
+        """Клиенту, принимающему gzip, отдаётся сжатая копия."""
+        response = self.get("app.js", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        content = b"".join(response.streaming_content)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            response["Content-Type"], mimetypes.guess_type("app.js")[0]
+        )
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(content), SCRIPT)
+
+    def test_identity(self):
+        """Без Accept-Encoding или с q=0 отдаётся исходный файл."""
+        for accept_encoding in ("", "gzip;q=0"):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.get(
+                    "app.js", HTTP_ACCEPT_ENCODING=accept_encoding
+                )
+                content = b"".join(response.streaming_content)
+
+                self.assertFalse(response.has_header("Content-Encoding"))
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+                self.assertEqual(content, SCRIPT)
+
+    def test_hashed_name_is_immutable(self):
+        """Файлы с хэшем манифеста в имени кэшируются навсегда."""
+        self.assertIn(
+            "immutable", self.get("app.0123456789ab.js")["Cache-Control"]
+        )
+        self.assertNotIn("immutable", self.get("app.js")["Cache-Control"])
@@ -0,0 +1,87 @@
+import multiprocessing
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from yatube.cache import SQLiteCache
+from yatube.cache import sqlite
+
+
+def _incr_many(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr("counter")
+
+
+class TestSQLiteCache(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.path = f"{self.workdir}/cache.sqlite3"
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {"OPTIONS": options})
+
+    def test_values_are_shared_between_instances(self):
+        """Записи видны другим экземплярам, открывшим тот же файл."""
+        self.cache.set("key", {"value": [1, 2]})
+
+        self.assertEqual(self.make_cache().get("key"), {"value": [1, 2]})
+
+    def test_expired_entries_are_not_returned(self):
+        """Просроченная запись не отдаётся и может быть добавлена заново."""
+        with mock.patch("yatube.cache.sqlite.time.time", return_value=100):
+            self.cache.set("key", "old", 10)
+        with mock.patch("yatube.cache.sqlite.time.time", return_value=111):
+            self.assertIsNone(self.cache.get("key"))
+            self.assertTrue(self.cache.add("key", "new"))
+            self.assertFalse(self.cache.add("key", "newer"))
+            self.assertEqual(self.cache.get("key"), "new")
+
+    def test_least_recently_read_entries_are_evicted(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=10)
+        with mock.patch.object(sqlite, "CULL_INTERVAL", 1):
+            for num, key in enumerate("abc"):
+                with mock.patch("yatube.cache.sqlite.time.time",
+                                return_value=100 + num * 10):
+                    cache.set(key, num)
+            with mock.patch("yatube.cache.sqlite.time.time",
+                            return_value=200):
+                cache.get("a")
+                cache.set("d", 3)
+
+                self.assertEqual(
+                    cache.get_many("abcd"), {"a": 0, "c": 2, "d": 3}
+                )
+
+    def test_read_does_not_wait_for_writer(self):
+        """Чтение не ждёт чужую транзакцию записи и не падает из-за неё."""
+        self.cache.set("key", "value")
+        writer = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute("UPDATE cache SET accessed = 0")
+        writer.execute("BEGIN IMMEDIATE")
+        self.addCleanup(writer.execute, "ROLLBACK")
+
+        with mock.patch.object(sqlite, "BUSY_TIMEOUT", 60):
+            self.assertEqual(self.make_cache().get("key"), "value")
+
+    def test_incr_is_atomic_across_processes(self):
+        """incr из нескольких процессов не теряет приращений."""
+        self.cache.set("counter", 0)
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=_incr_many, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(self.cache.get("counter"), 200)
@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from yatube.cache import TieredCache
+from yatube.cache import tiered
+
+
+class TestTieredCache(SimpleTestCase):
+    def setUp(self):
+        clock = mock.patch("yatube.cache.tiered.time.monotonic",
+                           return_value=1000.0)
+        self.clock = clock.start()
+        self.addCleanup(clock.stop)
+        # Two instances over one L2 stand for two worker processes.
+        self.worker, self.other_worker = self.make_cache(), self.make_cache()
+        self.worker.clear()
+        self.worker.reset_stats()
+
+    def make_cache(self):
+        return TieredCache("", {
+            "OPTIONS": {
+                "CACHE": {
+                    "BACKEND":
+                        "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "tiered-tests",
+                },
+                # Both instances live in this process, so LocMemCache
+                # stands for a cache shared between processes.
+                "SHARED": True,
+                "L1_MAX_ENTRIES": 2,
+                "L1_TIMEOUT": 5,
+            },
+        })
+
+    def wait(self, seconds):
+        self.clock.return_value += seconds
+
+    def test_hot_keys_are_read_from_l1(self):
+        """Повторное чтение не обращается к общему кэшу."""
+        self.worker.set("key", "value")
+        self.worker._l2.delete("key")
+
+        self.assertEqual(self.worker.get("key"), "value")
+
+    def test_l1_entries_expire(self):
+        """Запись в L1 живёт не дольше L1_TIMEOUT."""
+        self.worker.set("key", "value")
+        self.worker._l2.delete("key")
+        self.wait(6)
+
+        self.assertIsNone(self.worker.get("key"))
+
+    def test_l1_evicts_least_recently_used(self):
+        """L1 не превышает L1_MAX_ENTRIES и вытесняет старые ключи."""
+        for key in ("a", "b", "c"):
+            self.worker.set(key, key)
+
+        self.assertEqual(list(self.worker._l1), [("b", None), ("c", None)])
+
+    def test_changes_reach_other_processes(self):
+        """Изменения из другого процесса вытесняют ключ из L1."""
+        self.other_worker.set("key", "old")
+        self.assertEqual(self.worker.get("key"), "old")
+
+        self.other_worker.set("key", "new")
+        self.wait(tiered.CHECK_INTERVAL)
+
+        self.assertEqual(self.worker.get("key"), "new")
+
+    def test_lost_log_clears_l1(self):
+        """Если журнал изменений потерян, L1 очищается целиком."""
+        self.other_worker.set("key", "old")
+        self.worker.get("key")
+        self.other_worker.set("key", "new")
+        last = self.worker._l2.get(tiered.SEQUENCE_KEY)
+        self.worker._l2.delete(tiered.LOG_KEY.format(last))
+        self.wait(tiered.CHECK_INTERVAL)
+
+        self.assertEqual(self.worker.get("key"), "new")
+
+    def test_process_local_l2_gets_no_log(self):
+        """Над кэшем в памяти процесса журнал изменений не ведётся."""
+        cache = TieredCache("tiered-local-tests", {})
+        cache.clear()
+
+        for num in range(10):
+            cache.set(f"key{num}", num)
+
+        self.assertFalse(cache.shared)
+        self.assertIsNone(cache._l2.get(tiered.SEQUENCE_KEY))
+        self.assertIsNone(cache._l2.get(tiered.LOG_KEY.format(1)))
+
+    def test_stats_show_hit_ratios(self):
+        """Статистика показывает доли попаданий в L1 и L2."""
+        self.other_worker.set("key", "value")
+        self.worker.get("key")
+        self.worker.get("key")
+        self.worker.get("missing")
+
+        stats = self.worker.stats()
+
+        self.assertEqual(stats["l1_hit_ratio"], 1 / 3)
+        self.assertEqual(stats["l2_hit_ratio"], 1 / 2)
@@ -13,11 +13,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.conf import settings
 from django.conf.urls import handler404, handler500
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from . import serving
 
 urlpatterns = [
     path("auth/", include("users.urls", namespace="users")),
@@ -30,12 +33,17 @@ urlpatterns = [
 handler404 = "yatube.views.page_not_found"    # noqa
 handler500 = "yatube.views.server_error"    # noqa
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
-    urlpatterns += static(
-        settings.STATIC_URL,
-        document_root=settings.STATIC_ROOT
-    )
+if settings.MEDIA_URL.startswith("/"):
+    urlpatterns.append(re_path(
+        r"^%s(?P<path>.*)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+        serving.media,
+        name="media",
+    ))
+
+# Collected files; runserver serves the app directories itself in DEBUG.
+if settings.STATIC_URL.startswith("/"):
+    urlpatterns.append(re_path(
+        r"^%s(?P<path>.*)$" % re.escape(settings.STATIC_URL.lstrip("/")),
+        serving.static,
+        name="static",
+    ))